@@ -1,8 +1,8 @@
 import os
 import sys
+import uuid
 
 from streamlit_mic_recorder import mic_recorder
-from src.audio_utils import speech_to_text_from_bytes, text_to_speech_bytes
 
 import streamlit as st
 from dotenv import load_dotenv
@@ -38,7 +38,60 @@ SRC_DIR = os.path.join(CURRENT_DIR, "src")
 if SRC_DIR not in sys.path:
     sys.path.append(SRC_DIR)
 
-from agent.graph import graph  # type: ignore
+from agent.graph import AnswerStream  # type: ignore
+from audio_utils import TTSError, speech_to_text_from_bytes, text_to_speech_stream  # type: ignore
+
+# Messages drawn per page of chat history; older ones are behind "load older"
+HISTORY_PAGE = 20
+
+
+@st.cache_resource(show_spinner="AgroSense तैयार हो रहा है...")
+def load_resources() -> dict:
+    """
+    Build the heavy, process-wide objects once per server process (not on
+    every rerun or first question) and share them across all sessions.
+    """
+    from agent.graph import graph  # type: ignore
+    from agent.session_store import get_session_store  # type: ignore
+    from llm_clients import get_chat_model, get_embeddings  # type: ignore
+    from rag import retriever  # type: ignore
+    from tools.profile_store import get_crop_profiles  # type: ignore
+    from tracing import start_metrics_server  # type: ignore
+
+    resources = {"graph": graph, "session_store": get_session_store(), "profiles": get_crop_profiles()}
+    try:
+        resources["chat"] = get_chat_model(temperature=0.3)
+        resources["embeddings"] = get_embeddings()
+        resources["lexical"] = retriever.get_lexical_index()
+        resources["topics"] = retriever.get_topic_index()
+        resources["docs"] = retriever.get_doc_store()
+        resources["dense"] = retriever.get_dense_index()
+        if resources["dense"] is None:
+            resources["vectordb"] = retriever.get_vectordb()
+    except Exception as e:
+        # Anything not warmed here is built on first use instead
+        print("Warm-up skipped:", repr(e))
+
+    # Prometheus-style /metrics endpoint, only if AGROSENSE_METRICS_PORT is set
+    start_metrics_server()
+    return resources
+
+
+@st.fragment
+def tts_player(i: int, text: str):
+    """TTS button of one message; clicking it reruns only this fragment, not the whole page."""
+    if st.button("🔊 जवाब सुनें", key=f"tts_{i}"):
+        # Sentences are synthesized concurrently and joined in order
+        try:
+            audio_bytes = b"".join(text_to_speech_stream(text))
+        except TTSError as e:
+            print("TTS failed:", repr(e))
+            audio_bytes = b""
+        if audio_bytes:
+            st.audio(audio_bytes, format="audio/mp3")
+        else:
+            st.error("आवाज़ बनाने में दिक्कत आई, कृपया दोबारा कोशिश करें।")
+
 
 # ----------------- STREAMLIT UI -----------------
 
@@ -65,13 +118,39 @@ with st.sidebar:
     )
     st.markdown("---")
 
+resources = load_resources()
+
 # Chat history
 if "messages" not in st.session_state:
     st.session_state["messages"] = []
+if "history_shown" not in st.session_state:
+    st.session_state["history_shown"] = HISTORY_PAGE
+
+# Conversation facts (known parameters, language) live in the session store,
+# keyed by an id kept in the URL. The chat history is not stored, so a
+# reload starts a fresh session; the one in the URL is only continued when
+# the user asks for it, instead of silently reusing facts they cannot see.
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+    previous = st.query_params.get("session")
+    st.session_state["resumable_session"] = (
+        previous if previous and resources["session_store"].load(previous) else None
+    )
 
-# Persist agent state between turns
-if "agent_state" not in st.session_state:
-    st.session_state["agent_state"] = {}
+resumable = st.session_state.get("resumable_session")
+if resumable and not st.session_state["messages"]:
+    params = resources["session_store"].load(resumable).get("extracted_params") or {}
+    known = {k: v for k, v in params.items() if v is not None}
+    with st.sidebar:
+        st.info(
+            "पिछली बातचीत मिली / Previous conversation found"
+            + (f" ({', '.join(f'{k}={v}' for k, v in known.items())})" if known else "")
+        )
+        if st.button("↩️ पिछली बातचीत जारी रखें / Resume", key="resume_session"):
+            st.session_state["session_id"] = resumable
+            st.session_state["resumable_session"] = None
+            st.query_params["session"] = resumable
+            st.rerun()
 
 st.title("🌱 AgroSense – The Curious Farming Assistant")
 
@@ -111,17 +190,76 @@ if user_input is None:
     if text_input:
         user_input = text_input
 
+# ----------------- RENDER CHAT HISTORY (WITH TTS + REASONING) -----------------
+# Drawn before handling the new turn so the streamed reply appears below it.
+# Only the latest `history_shown` messages are drawn, so a rerun costs the
+# same however long the conversation gets.
+
+last_extracted = st.session_state.get("last_extracted_params")
+last_crops = st.session_state.get("last_crop_results")
+last_timings = st.session_state.get("last_timings")
+last_context_tokens = st.session_state.get("last_context_tokens")
+last_answer_cached = st.session_state.get("last_answer_cached")
+last_trace = st.session_state.get("last_trace")
+
+messages = st.session_state["messages"]
+first_shown = max(0, len(messages) - st.session_state["history_shown"])
+if first_shown > 0:
+    if st.button(f"⬆️ पुराने संदेश देखें / Load older ({first_shown} hidden)", key="load_older"):
+        st.session_state["history_shown"] += HISTORY_PAGE
+        st.rerun()
+
+for i in range(first_shown, len(messages)):
+    msg = messages[i]
+    with st.chat_message(msg["role"]):
+        st.markdown(msg["content"])
+
+        if msg["role"] == "assistant":
+            # TTS button for each assistant message
+            tts_player(i, msg["content"])
+
+            # Show reasoning only for the *latest* assistant message
+            if i == len(messages) - 1:
+                with st.expander("🔍 See AgroSense reasoning", expanded=False):
+                    if last_extracted:
+                        st.markdown("**Known Environment Parameters:**")
+                        st.json(last_extracted)
+                    if last_crops:
+                        st.markdown("**Top Crop Candidates:**")
+                        for j, item in enumerate(last_crops, start=1):
+                            st.write(
+                                f"{j}. **{item['crop']}** (score = `{item['score']:.2f}`)"
+                            )
+                    if last_timings and last_timings.get("total_s") is not None:
+                        st.markdown(
+                            f"**Timing:** first token in `{last_timings['time_to_first_token_s']:.2f}s`, "
+                            f"full reply in `{last_timings['total_s']:.2f}s`"
+                        )
+                    if last_context_tokens:
+                        st.markdown(f"**Document context:** `{last_context_tokens}` tokens")
+                    if last_answer_cached:
+                        st.markdown("**Answer cache:** reused an answer for the same field conditions")
+                    if last_trace and st.checkbox("Show step timings", key="show_trace"):
+                        st.dataframe(last_trace, hide_index=True, use_container_width=True)
+
 # ---- If we got any user_input this run, call the agent and update history ----
 if user_input:
     # Add user message to history
     st.session_state["messages"].append({"role": "user", "content": user_input})
+    with st.chat_message("user"):
+        st.markdown(user_input)
 
-    # Prepare input state: merge previous state + new query
-    prev_state = st.session_state["agent_state"] or {}
+    # Prepare input state: durable facts from earlier turns + new query
+    session_store = resources["session_store"]
+    prev_state = session_store.load(st.session_state["session_id"])
     input_state = {**prev_state, "query": user_input}
 
+    stream = AnswerStream(input_state)
     try:
-        result = graph.invoke(input_state)
+        # Render tokens as they arrive instead of waiting for the full answer
+        with st.chat_message("assistant"):
+            streamed_reply = st.write_stream(stream)
+        result = stream.result or {}
     except Exception as e:
         assistant_reply = (
             "Sorry, something went wrong while processing your request:\n\n"
@@ -130,12 +268,14 @@ if user_input:
         extracted_params = None
         crop_results = []
     else:
-        assistant_reply = result.get("answer", "I could not generate an answer.")
+        assistant_reply = result.get("answer") or streamed_reply or "I could not generate an answer."
         extracted_params = result.get("extracted_params", None)
         crop_results = result.get("crop_results", [])
 
-        # Save new agent state for next turn
-        st.session_state["agent_state"] = result
+        # Save the durable facts for the next turn; from now on the URL
+        # points at this conversation
+        session_store.save(st.session_state["session_id"], result)
+        st.query_params["session"] = st.session_state["session_id"]
 
     # Save assistant reply in history
     st.session_state["messages"].append(
@@ -146,34 +286,10 @@ if user_input:
     # (so we can show it under the last assistant message)
     st.session_state["last_extracted_params"] = extracted_params
     st.session_state["last_crop_results"] = crop_results
+    st.session_state["last_timings"] = stream.timings
+    st.session_state["last_context_tokens"] = (stream.result or {}).get("context_tokens")
+    st.session_state["last_answer_cached"] = (stream.result or {}).get("answer_cached")
+    st.session_state["last_trace"] = stream.trace.rows() if stream.trace else None
 
-# ----------------- RENDER FULL CHAT HISTORY (WITH TTS + REASONING) -----------------
-
-last_extracted = st.session_state.get("last_extracted_params")
-last_crops = st.session_state.get("last_crop_results")
-
-for i, msg in enumerate(st.session_state["messages"]):
-    with st.chat_message(msg["role"]):
-        st.markdown(msg["content"])
-
-        if msg["role"] == "assistant":
-            # TTS button for each assistant message
-            if st.button("🔊 जवाब सुनें", key=f"tts_{i}"):
-                audio_bytes = text_to_speech_bytes(msg["content"])
-                if audio_bytes:
-                    st.audio(audio_bytes, format="audio/mp3")
-                else:
-                    st.error("आवाज़ बनाने में दिक्कत आई, कृपया दोबारा कोशिश करें।")
-
-            # Show reasoning only for the *latest* assistant message
-            if i == len(st.session_state["messages"]) - 1:
-                with st.expander("🔍 See AgroSense reasoning", expanded=False):
-                    if last_extracted:
-                        st.markdown("**Known Environment Parameters:**")
-                        st.json(last_extracted)
-                    if last_crops:
-                        st.markdown("**Top Crop Candidates:**")
-                        for j, item in enumerate(last_crops, start=1):
-                            st.write(
-                                f"{j}. **{item['crop']}** (score = `{item['score']:.2f}`)"
-                            )
+    # Re-run so the new turn is drawn by the history loop (with TTS + reasoning)
+    st.rerun()
@@ -0,0 +1,280 @@
+# src/agent/answer_cache.py
+
+"""
+Cache of final recommendation answers, keyed on quantized field parameters.
+
+Farmers in one district send nearly the same N/P/K/pH/temperature/rainfall
+values, so the answer for "N 82, pH 6.4" can be reused for "N 80, pH 6.5".
+The key combines:
+  - every parameter rounded to a bucket (see DEFAULT_BUCKETS),
+  - the reply language detected from the farmer's message,
+  - the live RAG index version and the crop profile table version,
+so re-indexing or editing crop_profiles.csv never serves stale answers.
+
+Two tiers: an in-memory LRU and an optional sqlite file, both with a TTL.
+
+Configuration:
+    AGROSENSE_ANSWER_CACHE          "0" disables the cache (default on)
+    AGROSENSE_ANSWER_CACHE_TTL      seconds (default 86400)
+    AGROSENSE_ANSWER_CACHE_ITEMS    in-memory entries (default 1024)
+    AGROSENSE_ANSWER_CACHE_DB       sqlite path for the second tier (default: none)
+    AGROSENSE_ANSWER_CACHE_BUCKETS  e.g. "n=10,p=10,ph=0.25" to override widths
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from agent.rule_parser import PARAM_KEYS
+
+# Bucket width per field; values in the same bucket share an answer
+DEFAULT_BUCKETS = {
+    "n": 10.0,
+    "p": 10.0,
+    "k": 10.0,
+    "temperature": 2.0,
+    "humidity": 5.0,
+    "ph": 0.25,
+    "rainfall": 20.0,
+}
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MEMORY_ITEMS = 1024
+DEFAULT_DISK_ITEMS = 50_000
+
+_DEVANAGARI = re.compile(r"[\u0900-\u097f]")
+_WORD = re.compile(r"[a-z]+")
+
+# Common Hindi words written in Latin script
+HINGLISH_MARKERS = {
+    "hai", "hain", "mera", "meri", "mere", "kya", "kaun", "kaunsi", "kaise",
+    "khet", "fasal", "mitti", "barish", "kam", "zyada", "jyada", "bahut",
+    "bohot", "aur", "nahi", "nahin", "ugaun", "ugau", "lagau", "bataiye",
+    "batao", "thanda", "garam", "paani", "pani",
+}
+
+
+def detect_language(text: str) -> str:
+    """
+    Reply language the answer prompt would pick: "hi" (Devanagari),
+    "hinglish" (Hindi in Latin script) or "en".
+    """
+    text = text or ""
+    if _DEVANAGARI.search(text):
+        return "hi"
+    words = _WORD.findall(text.casefold())
+    if words and sum(w in HINGLISH_MARKERS for w in words) >= max(1, len(words) // 10):
+        return "hinglish"
+    return "en"
+
+
+def bucket_widths() -> Dict[str, float]:
+    widths = dict(DEFAULT_BUCKETS)
+    for part in os.getenv("AGROSENSE_ANSWER_CACHE_BUCKETS", "").split(","):
+        field, _, value = part.partition("=")
+        field = field.strip().lower()
+        if field in widths:
+            try:
+                widths[field] = float(value)
+            except ValueError:
+                pass
+    return widths
+
+
+def quantize_params(params: Optional[dict], widths: Optional[Dict[str, float]] = None) -> Dict[str, Optional[int]]:
+    """Bucket number per field (None for missing values)."""
+    widths = widths or bucket_widths()
+    params = params or {}
+    out = {}
+    for key in PARAM_KEYS:
+        value = params.get(key)
+        width = widths.get(key) or 1.0
+        out[key] = None if value is None else int(round(float(value) / width))
+    return out
+
+
+def make_key(params: Optional[dict], language: str, index_version: str, profile_version: str) -> str:
+    payload = json.dumps(
+        {
+            "params": quantize_params(params),
+            "language": language,
+            "index": index_version,
+            "profiles": profile_version,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    TTL + LRU answer cache with an optional sqlite tier.
+
+    Values are small JSON-serializable dicts (answer text, crop results ...).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_TTL,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+        disk_items: int = DEFAULT_DISK_ITEMS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._conn = None
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+
+    def _db(self):
+        if self.path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers(last_used)")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return value
+                del self._memory[key]
+                self.expired += 1
+
+            conn = self._db()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM answers WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if expires_at > now:
+                        conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+                        conn.commit()
+                        self._remember(key, expires_at, value)
+                        self.hits_disk += 1
+                        return value
+                    conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                    conn.commit()
+                    self.expired += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.stores += 1
+
+            conn = self._db()
+            if conn is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at, now),
+            )
+            count = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            if count > self.disk_items:
+                conn.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+                excess = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - int(self.disk_items * 0.9)
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM answers WHERE key IN ("
+                        " SELECT key FROM answers ORDER BY last_used ASC LIMIT ?)",
+                        (excess,),
+                    )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM answers")
+                conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.hits_memory + self.hits_disk
+            lookups = hits + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "expired": self.expired,
+                "stores": self.stores,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _env_number(name, default, cast):
+    try:
+        return cast(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Process-wide answer cache, or None if AGROSENSE_ANSWER_CACHE=0."""
+    global _default_cache
+    if os.getenv("AGROSENSE_ANSWER_CACHE", "1") == "0":
+        return None
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = AnswerCache(
+                    path=os.getenv("AGROSENSE_ANSWER_CACHE_DB") or None,
+                    ttl=_env_number("AGROSENSE_ANSWER_CACHE_TTL", DEFAULT_TTL, float),
+                    memory_items=_env_number("AGROSENSE_ANSWER_CACHE_ITEMS", DEFAULT_MEMORY_ITEMS, int),
+                )
+    return _default_cache
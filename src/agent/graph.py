@@ -1,12 +1,32 @@
 # src/agent/graph.py
 
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from dotenv import load_dotenv
+import asyncio
+import logging
+import threading
+import time
+
+from langgraph.constants import END
 
 from agent.schema import AgentState
-from agent.parameter_extractor import parse_environment_parameters
-from agent.tools import tool_crop_recommendation, tool_rag_retrieve
+from agent.parameter_extractor import (
+    parse_environment_parameters,
+    aparse_environment_parameters,
+)
+from agent.tools import (
+    tool_crop_recommendation,
+    tool_rag_retrieve,
+    atool_crop_recommendation,
+    atool_rag_retrieve,
+)
+from agent.answer_cache import detect_language, get_answer_cache, make_key
+from llm_clients import get_chat_model
+from rag.context import assemble_context
+from rag.retriever import resolve_documents
+from rag.index_store import index_version
+from tools.profile_store import get_crop_profiles
+from tracing import annotate, tracer, traced
+
+logger = logging.getLogger(__name__)
 
 
 # ---------- Nodes ----------
@@ -15,16 +35,61 @@ def node_extract_params(state: AgentState) -> dict:
     """
     Extract and merge environment parameters, decide if we need more info.
     """
-    return parse_environment_parameters(state)
+    return {**parse_environment_parameters(state), "answer_cached": False}
 
 
-def node_ask_for_more_info(state: AgentState) -> dict:
+async def anode_extract_params(state: AgentState) -> dict:
+    return {**await aparse_environment_parameters(state), "answer_cached": False}
+
+
+def node_cache_lookup(state: AgentState) -> dict:
     """
-    Ask user for only the missing fields in a short, conversational way.
+    Look the turn up in the answer cache (quantized params + language +
+    index / profile versions). A hit fills in the answer and skips scoring,
+    retrieval and generation.
+    Only turns that supply parameters are cached; a follow-up question on
+    already known values always gets a fresh answer.
     """
-    load_dotenv()
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+    language = detect_language(state.query)
+    cache = get_answer_cache()
+    if cache is None or not state.new_fields:
+        return {"language": language, "cache_key": None, "answer_cached": False}
+
+    key = make_key(state.extracted_params, language, index_version(), get_crop_profiles().version)
+    hit = cache.get(key)
+    annotate(cache_hit=hit is not None)
+    if hit is None:
+        return {"language": language, "cache_key": key, "answer_cached": False}
+
+    logger.info("answer cache hit (hit rate %.0f%%)", cache.stats()["hit_rate"] * 100)
+    return {**hit, "rag_results": None, "language": language, "cache_key": key, "answer_cached": True}
+
+
+async def anode_cache_lookup(state: AgentState) -> dict:
+    # The optional sqlite tier does blocking I/O
+    return await asyncio.to_thread(node_cache_lookup, state)
+
+
+def node_cache_store(state: AgentState) -> dict:
+    """Remember the generated answer under this turn's cache key."""
+    cache = get_answer_cache()
+    if cache is not None and state.cache_key and state.answer:
+        cache.put(
+            state.cache_key,
+            {
+                "answer": state.answer,
+                "crop_results": state.crop_results,
+                "context_tokens": state.context_tokens,
+            },
+        )
+    return {}
+
+
+async def anode_cache_store(state: AgentState) -> dict:
+    return await asyncio.to_thread(node_cache_store, state)
 
+
+def _ask_for_more_info_prompt(state: AgentState) -> str:
     missing = state.missing_fields or []
 
     # Map internal keys to farmer-friendly names
@@ -38,7 +103,7 @@ def node_ask_for_more_info(state: AgentState) -> dict:
     }
     missing_readable = [pretty_names.get(m, m) for m in missing]
 
-    prompt = f"""
+    return f"""
     You are AgroSense, a friendly agronomy assistant.
 
     The farmer said:
@@ -56,16 +121,33 @@ def node_ask_for_more_info(state: AgentState) -> dict:
     Keep it brief and conversational.
     """
 
-    resp = llm.invoke(prompt)
-    return {"answer": resp.content}
-
 
-def node_llm_answer(state: AgentState) -> dict:
+def node_ask_for_more_info(state: AgentState) -> dict:
     """
-    Final answer: combine numeric results + RAG into a short, human-like reply.
+    Ask user for only the missing fields in a short, conversational way.
     """
-    load_dotenv()
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+    llm = get_chat_model(temperature=0.3)
+
+    resp = llm.invoke(_ask_for_more_info_prompt(state))
+    return {"answer": resp.content}
+
+
+async def anode_ask_for_more_info(state: AgentState) -> dict:
+    llm = get_chat_model(temperature=0.3)
+
+    resp = await llm.ainvoke(_ask_for_more_info_prompt(state))
+    return {"answer": resp.content}
+
+
+def _llm_answer_prompt(state: AgentState) -> tuple[str, dict]:
+    """Answer prompt plus the assembled (ranked, de-duplicated, budgeted) context."""
+    # rag_results are chunk references; the texts are read only here
+    context = assemble_context(resolve_documents(state.rag_results))
+    logger.info(
+        "answer context: %d/%d tokens from %d chunks (dropped %d duplicate, %d over budget)",
+        context["tokens"], context["budget"], len(context["used"]),
+        context["dropped_duplicates"], context["dropped_budget"],
+    )
 
     prompt = f"""
     You are AgroSense, a friendly agronomy assistant talking to a farmer.
@@ -79,8 +161,8 @@ def node_llm_answer(state: AgentState) -> dict:
     Top crop candidates with numeric suitability (lower score = better):
     {state.crop_results}
 
-    Relevant agronomy notes (summaries of documents):
-    {state.rag_results}
+    Relevant agronomy notes (excerpts from documents):
+    {context["text"]}
 
     Write a SHORT, conversational answer:
     - Start with 1–2 best crops and clearly say why they fit.
@@ -90,50 +172,213 @@ def node_llm_answer(state: AgentState) -> dict:
     Use at most 2–3 short paragraphs or 1 paragraph + a few bullet points.
     Avoid long essays and heavy technical jargon.
     """
+    return prompt, context
+
+
+def node_llm_answer(state: AgentState) -> dict:
+    """
+    Final answer: combine numeric results + RAG into a short, human-like reply.
+    """
+    llm = get_chat_model(temperature=0.3)
 
+    prompt, context = _llm_answer_prompt(state)
     resp = llm.invoke(prompt)
-    return {"answer": resp.content}
+    return {"answer": resp.content, "context_tokens": context["tokens"]}
+
+
+async def anode_llm_answer(state: AgentState) -> dict:
+    llm = get_chat_model(temperature=0.3)
+
+    prompt, context = _llm_answer_prompt(state)
+    resp = await llm.ainvoke(prompt)
+    return {"answer": resp.content, "context_tokens": context["tokens"]}
 
 
 # ---------- Graph Definition ----------
 
-workflow = StateGraph(AgentState)
+def _node(name: str, func, afunc):
+    """Graph node with a sync and an async implementation, each traced as a "node" span."""
+    from langchain_core.runnables import RunnableLambda
 
-workflow.add_node("extract_params", node_extract_params)
-workflow.add_node("ask_for_more_info", node_ask_for_more_info)
-workflow.add_node("crop_recommender", tool_crop_recommendation)
-workflow.add_node("rag_retrieve", tool_rag_retrieve)
-workflow.add_node("llm_answer", node_llm_answer)
+    return RunnableLambda(traced("node", name)(func), afunc=traced("node", name)(afunc))
 
 
 def route_after_extract(state: AgentState) -> str:
     """
     If we still need key parameters, ask for them.
-    Otherwise, proceed to recommendation.
+    Otherwise, check the answer cache before full reasoning.
     """
     if state.needs_more_info:
         return "ask_for_more_info"
+    return "cache_lookup"
+
+
+def route_after_cache(state: AgentState) -> str:
+    """A cached answer ends the turn; otherwise go for full reasoning."""
+    if state.answer_cached:
+        return END
     return "crop_recommender"
 
 
-# Entry point
-workflow.set_entry_point("extract_params")
+def build_graph():
+    """Define and compile the agent graph."""
+    # langgraph takes about a second to import, so it is loaded on first use
+    from langgraph.graph import StateGraph
 
-# Conditional branch after extraction
-workflow.add_conditional_edges(
-    "extract_params",
-    route_after_extract,
-    {
-        "ask_for_more_info": "ask_for_more_info",
-        "crop_recommender": "crop_recommender",
-    },
-)
+    workflow = StateGraph(AgentState)
+
+    # Every node has a sync and an async implementation:
+    # graph.invoke() runs the first, graph.ainvoke() / astream() the second.
+    workflow.add_node("extract_params", _node("extract_params", node_extract_params, anode_extract_params))
+    workflow.add_node("ask_for_more_info", _node("ask_for_more_info", node_ask_for_more_info, anode_ask_for_more_info))
+    workflow.add_node("cache_lookup", _node("cache_lookup", node_cache_lookup, anode_cache_lookup))
+    workflow.add_node("cache_store", _node("cache_store", node_cache_store, anode_cache_store))
+    workflow.add_node("crop_recommender", _node("crop_recommender", tool_crop_recommendation, atool_crop_recommendation))
+    workflow.add_node("rag_retrieve", _node("rag_retrieve", tool_rag_retrieve, atool_rag_retrieve))
+    workflow.add_node("llm_answer", _node("llm_answer", node_llm_answer, anode_llm_answer))
+
+    # Entry point
+    workflow.set_entry_point("extract_params")
 
-# Normal linear flow for full reasoning
-workflow.add_edge("crop_recommender", "rag_retrieve")
-workflow.add_edge("rag_retrieve", "llm_answer")
-workflow.add_edge("ask_for_more_info", END)
-workflow.add_edge("llm_answer", END)
+    # Conditional branch after extraction
+    workflow.add_conditional_edges(
+        "extract_params",
+        route_after_extract,
+        {
+            "ask_for_more_info": "ask_for_more_info",
+            "cache_lookup": "cache_lookup",
+        },
+    )
 
-graph = workflow.compile()
+    workflow.add_conditional_edges(
+        "cache_lookup",
+        route_after_cache,
+        {
+            END: END,
+            "crop_recommender": "crop_recommender",
+        },
+    )
+
+    # Full reasoning: crop scoring first (sub-millisecond), because retrieval
+    # looks up the notes of the recommended crops by topic. The slow part,
+    # the query search, still overlaps other work: rag_retrieve runs it
+    # concurrently with that topic lookup.
+    workflow.add_edge("crop_recommender", "rag_retrieve")
+    workflow.add_edge("rag_retrieve", "llm_answer")
+    workflow.add_edge("llm_answer", "cache_store")
+    workflow.add_edge("ask_for_more_info", END)
+    workflow.add_edge("cache_store", END)
+
+    return workflow.compile()
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The compiled agent graph, built on first use."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = build_graph()
+    return _graph
+
+
+def __getattr__(name):
+    # `from agent.graph import graph` keeps working, compiling on first access
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+
+# ---------- Streaming ----------
+
+# Nodes whose LLM tokens make up the user-facing reply
+STREAMED_NODES = {"llm_answer", "ask_for_more_info"}
+
+
+class AnswerStream:
+    """
+    Run the graph and yield reply tokens as they are generated.
+
+    Iterate it (sync: graph.stream, async: graph.astream) to receive text
+    chunks from STREAMED_NODES. After iteration:
+      - `result` holds the final state (same dict graph.invoke returns)
+      - `timings` holds time_to_first_token_s and total_s for the turn
+      - `trace` holds the tracing spans of the turn (nodes, LLM, retrieval)
+    If no tokens were streamed (e.g. a non-streaming model), the final
+    answer is yielded once at the end so callers always get the reply.
+    """
 
+    def __init__(self, input_state: dict, config: dict | None = None):
+        self.input_state = input_state
+        self.config = config
+        self.result: dict | None = None
+        self.timings: dict = {}
+        self.trace = None
+        self._start = 0.0
+        self._streamed = False
+
+    def _begin(self):
+        self._start = time.perf_counter()
+        self._streamed = False
+        self.timings = {"time_to_first_token_s": None, "total_s": None}
+
+    def _handle(self, mode, chunk):
+        """Return the text to yield for one (mode, chunk) pair, or None."""
+        if mode == "values":
+            self.result = chunk
+            return None
+
+        msg, meta = chunk
+        text = msg.content if isinstance(msg.content, str) else None
+        if not text or meta.get("langgraph_node") not in STREAMED_NODES:
+            return None
+
+        if not self._streamed:
+            self._streamed = True
+            self.timings["time_to_first_token_s"] = time.perf_counter() - self._start
+        return text
+
+    def _finish(self):
+        self.timings["total_s"] = time.perf_counter() - self._start
+        if self.timings["time_to_first_token_s"] is None:
+            self.timings["time_to_first_token_s"] = self.timings["total_s"]
+        logger.info(
+            "turn finished ttft=%.3fs total=%.3fs streamed=%s",
+            self.timings["time_to_first_token_s"],
+            self.timings["total_s"],
+            self._streamed,
+        )
+        if not self._streamed and self.result:
+            return self.result.get("answer")
+        return None
+
+    def __iter__(self):
+        self._begin()
+        with tracer.trace("turn") as self.trace:
+            for mode, chunk in get_graph().stream(
+                self.input_state, self.config, stream_mode=["messages", "values"]
+            ):
+                text = self._handle(mode, chunk)
+                if text:
+                    yield text
+        tail = self._finish()
+        if tail:
+            yield tail
+
+    async def __aiter__(self):
+        self._begin()
+        with tracer.trace("turn") as self.trace:
+            async for mode, chunk in get_graph().astream(
+                self.input_state, self.config, stream_mode=["messages", "values"]
+            ):
+                text = self._handle(mode, chunk)
+                if text:
+                    yield text
+        tail = self._finish()
+        if tail:
+            yield tail
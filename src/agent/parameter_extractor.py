@@ -1,9 +1,17 @@
 # src/agent/parameter_extractor.py
 
-from langchain_openai import ChatOpenAI
 from agent.schema import AgentState
-from dotenv import load_dotenv
+from agent.rule_parser import (
+    PARAM_KEYS,
+    parse_parameters,
+    render_level_tables,
+    render_vague_terms,
+)
+from llm_clients import get_chat_model
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 # These are the minimal required keys to start crop recommendation
 REQUIRED_KEYS = ["n", "p", "k", "ph", "temperature", "rainfall"]  # humidity optional
@@ -34,29 +42,19 @@ REFUSAL_PATTERNS = [
 ]
 
 
-def parse_environment_parameters(state: AgentState) -> dict:
-    load_dotenv()
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
-    # Previous parameters we already know from earlier turns
-    prev = state.extracted_params or {
-        "n": None,
-        "p": None,
-        "k": None,
-        "temperature": None,
-        "humidity": None,
-        "ph": None,
-        "rainfall": None,
-    }
-
+def _build_extraction_prompt(query: str, keys: list[str] | None = None) -> str:
     # NOTE: This model's only job is to output JSON. We don't care about
     # Hindi/English style here, only correct numeric extraction.
-    prompt = f"""
+    # `keys` limits the request to the fields the rule parser could not resolve.
+    keys = keys or PARAM_KEYS
+    keys_block = ",\n".join(f'    "{k}": ...' for k in keys)
+
+    return f"""
 You are an expert agronomy assistant. Your ONLY job is to read the user's text
 and extract farming environmental parameters into a JSON object.
 
 USER MESSAGE (may be Hindi, Hinglish, or English, in Devanagari or Latin script):
-{state.query}
+{query}
 
 INTERPRETATION RULES:
 - The farmer may mix Hindi and English (e.g., "mere khet me nitrogen kam hai", "rainfall high hai").
@@ -71,55 +69,51 @@ OUTPUT RULES:
   - "pH 6.5", "ph 6 ke aas paas" → ph ≈ 6
 - If vague words like "low / medium / high" (or Hindi equivalents) appear, convert using THESE FIXED MAPPINGS:
 
-  NITROGEN (N):
-    low / kam = 30
-    medium / normal = 60
-    high / zyada = 90
-  
-  PHOSPHORUS (P):
-    low / kam = 30
-    medium / normal = 50
-    high / zyada = 70
-  
-  POTASSIUM (K):
-    low / kam = 20
-    medium / normal = 40
-    high / zyada = 80
+{render_level_tables()}
 
 - For temperature, humidity, pH, rainfall:
     - Extract numeric values if present (e.g., "temp 30", "40 degree") → temperature=30 or 40.
     - If vague terms appear, use:
-        temperature: thanda/cool=20, garam/warm=30, bahut garam/very hot=35
-        rainfall: kam barish=80, normal barish=150, zyada barish/bohot barish=220
-        humidity: kam=40, medium=60, zyada=80
+{render_vague_terms()}
     - If not mentioned at all, set to null.
 
 RETURN JSON WITH EXACT KEYS:
 {{
-    "n": ...,
-    "p": ...,
-    "k": ...,
-    "temperature": ...,
-    "humidity": ...,
-    "ph": ...,
-    "rainfall": ...
+{keys_block}
 }}
 """
 
-    raw = llm.invoke(prompt).content
 
+def _parse_llm_json(raw: str) -> dict:
     try:
-        current = json.loads(raw)
+        return json.loads(raw)
     except Exception:
-        current = {
-            "n": None,
-            "p": None,
-            "k": None,
-            "temperature": None,
-            "humidity": None,
-            "ph": None,
-            "rainfall": None,
-        }
+        return {key: None for key in PARAM_KEYS}
+
+
+def _combine(rule_values: dict, llm_values: dict | None) -> dict:
+    """Rule-parser values win; the LLM only fills the fields rules left empty."""
+    current = dict(rule_values)
+    for key in PARAM_KEYS:
+        if current.get(key) is None and llm_values:
+            current[key] = llm_values.get(key)
+    return current
+
+
+def _merge_extraction(state: AgentState, current: dict, path: str) -> dict:
+    """
+    Merge this turn's values with what we already knew.
+    """
+    # Previous parameters we already know from earlier turns
+    prev = state.extracted_params or {
+        "n": None,
+        "p": None,
+        "k": None,
+        "temperature": None,
+        "humidity": None,
+        "ph": None,
+        "rainfall": None,
+    }
 
     # Merge: new non-null values override old ones
     combined = {}
@@ -139,8 +133,47 @@ RETURN JSON WITH EXACT KEYS:
         missing = []
         needs_more_info = False
 
+    new_fields = sorted(k for k, v in current.items() if v is not None)
+    logger.info(
+        "parameter extraction path=%s new=%s missing=%s",
+        path,
+        new_fields,
+        missing,
+    )
+
     return {
         "extracted_params": combined,
         "missing_fields": missing,
         "needs_more_info": needs_more_info,
+        "new_fields": new_fields,
     }
+
+
+def parse_environment_parameters(state: AgentState) -> dict:
+    """
+    Local rule parser first; the LLM is asked only for the fields the rules
+    could not resolve, and only if the message seems to contain them (hint
+    words left over, or a free-text description the rules found nothing in).
+    """
+    rules = parse_parameters(state.query)
+    if not rules.needs_llm:
+        return _merge_extraction(state, rules.values, "rules")
+
+    llm = get_chat_model(temperature=0)
+
+    raw = llm.invoke(_build_extraction_prompt(state.query, rules.unresolved)).content
+    path = "rules+llm" if len(rules.unresolved) < len(PARAM_KEYS) else "llm"
+    return _merge_extraction(state, _combine(rules.values, _parse_llm_json(raw)), path)
+
+
+async def aparse_environment_parameters(state: AgentState) -> dict:
+    """Async twin of parse_environment_parameters (same rules, prompt and merge)."""
+    rules = parse_parameters(state.query)
+    if not rules.needs_llm:
+        return _merge_extraction(state, rules.values, "rules")
+
+    llm = get_chat_model(temperature=0)
+
+    raw = (await llm.ainvoke(_build_extraction_prompt(state.query, rules.unresolved))).content
+    path = "rules+llm" if len(rules.unresolved) < len(PARAM_KEYS) else "llm"
+    return _merge_extraction(state, _combine(rules.values, _parse_llm_json(raw)), path)
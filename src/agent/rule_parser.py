@@ -0,0 +1,325 @@
+# src/agent/rule_parser.py
+
+"""
+Deterministic, local parameter extraction.
+
+Handles the common cases ("N 80 P 40 K 40 pH 6.5 temp 28 rainfall 200",
+"nitrogen kam hai", "zyada barish", "30°C", Devanagari digits ...) without
+an LLM call. Whatever it cannot resolve is left as None so the caller can
+ask the LLM for just those fields.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+PARAM_KEYS = ["n", "p", "k", "temperature", "humidity", "ph", "rainfall"]
+
+# ---------- Mapping tables (also rendered into the LLM prompt) ----------
+
+# Vague level -> value, per field
+LEVEL_VALUES = {
+    "n": {"low": 30, "medium": 60, "high": 90},
+    "p": {"low": 30, "medium": 50, "high": 70},
+    "k": {"low": 20, "medium": 40, "high": 80},
+    "temperature": {"low": 20, "high": 30},
+    "humidity": {"low": 40, "medium": 60, "high": 80},
+    "rainfall": {"low": 80, "medium": 150, "high": 220},
+}
+
+# Words meaning low / medium / high (Latin + Devanagari)
+LEVEL_WORDS = {
+    "low": ["low", "kam", "kum", "कम"],
+    "medium": ["medium", "normal", "moderate", "average", "madhyam", "samanya", "मध्यम", "सामान्य", "नॉर्मल"],
+    "high": [
+        "high", "zyada", "jyada", "zyaada", "jyaada", "jada", "jaada", "adhik",
+        "ज़्यादा", "ज्यादा", "जादा", "अधिक",
+    ],
+}
+
+# Standalone temperature phrases
+TEMPERATURE_PHRASES = {
+    "bahut garam": 35, "bohot garam": 35, "very hot": 35, "बहुत गर्म": 35, "बहुत गरम": 35,
+    "thanda": 20, "thandi": 20, "cool": 20, "ठंडा": 20, "ठंडी": 20,
+    "garam": 30, "garmi": 30, "warm": 30, "hot": 30, "गर्म": 30, "गरम": 30, "गर्मी": 30,
+}
+
+# Field names as the farmer may write them
+FIELD_ALIASES = {
+    "n": ["n", "nitrogen", "naitrojan", "नाइट्रोजन"],
+    "p": ["p", "phosphorus", "phosphorous", "fosforus", "फास्फोरस", "फॉस्फोरस"],
+    "k": ["k", "potassium", "potash", "पोटाश", "पोटैशियम", "पोटेशियम"],
+    "ph": ["ph", "पीएच"],
+    "temperature": ["temp", "temperature", "tapman", "taapmaan", "तापमान"],
+    "humidity": ["humidity", "nami", "नमी", "आर्द्रता"],
+    "rainfall": ["rainfall", "rain", "barish", "baarish", "barsaat", "बारिश", "वर्षा", "बरसात"],
+}
+
+# Unit -> (field, multiplier)
+UNIT_FIELDS = {
+    "°c": ("temperature", 1), "℃": ("temperature", 1), "c": ("temperature", 1),
+    "degree": ("temperature", 1), "degrees": ("temperature", 1), "deg": ("temperature", 1),
+    "celsius": ("temperature", 1), "डिग्री": ("temperature", 1),
+    "mm": ("rainfall", 1), "मिमी": ("rainfall", 1), "cm": ("rainfall", 10),
+}
+
+# Plausible ranges; values outside are left for the LLM
+VALID_RANGES = {
+    "n": (0, 300),
+    "p": (0, 300),
+    "k": (0, 300),
+    "temperature": (-10, 60),
+    "humidity": (0, 100),
+    "ph": (0, 14),
+    "rainfall": (0, 5000),
+}
+
+# Intensifiers that are dropped when they precede a level word ("bahut kam")
+INTENSIFIERS = {"bahut", "bohot", "bahot", "very", "बहुत"}
+
+# Greetings, acknowledgements and commands: a message made only of these
+# carries no field description, so it never goes to the LLM
+SMALL_TALK_WORDS = {
+    "hi", "hii", "hello", "hey", "namaste", "namaskar", "ram", "sat", "sri", "akal",
+    "good", "morning", "evening", "afternoon", "night",
+    "thanks", "thank", "you", "thankyou", "thx", "dhanyavad", "dhanyawad", "shukriya",
+    "ok", "okay", "okk", "haan", "han", "ha", "ji", "yes", "no", "nahi", "sure",
+    "bye", "help", "start", "restart", "reset", "stop", "clear", "new", "chat", "again",
+    "नमस्ते", "नमस्कार", "राम", "धन्यवाद", "शुक्रिया", "हाँ", "हां", "जी", "ठीक", "है", "नहीं",
+}
+
+# Weather / soil / water words the rules cannot turn into a value. Left
+# over in a message, they mean part of it describes the field in words,
+# so the LLM is asked for the fields that are still unresolved.
+DESCRIPTIVE_WORDS = {
+    "rains", "raining", "rainy", "rained", "monsoon", "downpour", "showers",
+    "heavy", "heavily", "wet", "dry", "drought", "flood", "floods", "flooded", "flooding",
+    "humid", "damp", "moist", "muggy", "sunny", "cloudy", "cold", "chilly", "freezing",
+    "soil", "sandy", "sand", "clay", "clayey", "loam", "loamy", "alluvial", "acidic", "acid",
+    "alkaline", "salty", "saline", "water", "waterlogged", "irrigated", "irrigation",
+    "pani", "mitti", "sukha", "sookha", "geela", "gila", "baadh", "badh",
+    "पानी", "मिट्टी", "सूखा", "गीला", "बाढ़", "रेतीली", "दोमट", "अम्लीय", "क्षारीय",
+}
+
+# Tokens between a field name and its value are allowed up to this count
+MAX_GAP = 3
+
+_DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+_TOKEN_RE = re.compile(
+    r"\d+(?:\.\d+)?"              # numbers
+    r"|°\s*c|℃|%"                 # unit symbols
+    r"|[a-z\u0900-\u0963\u0971-\u097f]+"  # Latin / Devanagari words
+    r"|[.,;!?।\n]"                # clause boundaries
+)
+
+_ALIAS_TO_FIELD = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+_WORD_TO_LEVEL = {word: level for level, words in LEVEL_WORDS.items() for word in words}
+_BOUNDARIES = set(".,;!?।\n")
+
+
+class RuleParseResult:
+    """Outcome of parse_parameters()."""
+
+    __slots__ = ("values", "leftover_hints", "free_text")
+
+    def __init__(self, values: Dict[str, Optional[float]], leftover_hints: List[str], free_text: bool = False):
+        self.values = values
+        self.leftover_hints = leftover_hints
+        # Nothing was extracted, but the message is more than small talk
+        # ("it's humid and rains a lot here")
+        self.free_text = free_text
+
+    @property
+    def unresolved(self) -> List[str]:
+        return [k for k in PARAM_KEYS if self.values.get(k) is None]
+
+    @property
+    def needs_llm(self) -> bool:
+        """
+        True if the message still carries parameter-like information we could
+        not map (stray numbers, level words, unresolved field names, weather
+        and soil words), or is a free-text description the rules found
+        nothing in. Greetings, commands
+        and messages fully handled by the rules do not need an LLM call.
+        """
+        return (bool(self.leftover_hints) or self.free_text) and bool(self.unresolved)
+
+
+def _tokenize(text: str) -> List[str]:
+    text = (text or "").lower().translate(_DEVANAGARI_DIGITS)
+    return [re.sub(r"\s+", "", t) for t in _TOKEN_RE.findall(text)]
+
+
+def _is_number(tok: str) -> bool:
+    return tok[0].isdigit()
+
+
+def _in_range(field: str, value: float) -> bool:
+    lo, hi = VALID_RANGES[field]
+    return lo <= value <= hi
+
+
+def parse_parameters(text: str) -> RuleParseResult:
+    tokens = _tokenize(text)
+    values: Dict[str, Optional[float]] = {k: None for k in PARAM_KEYS}
+    used = [False] * len(tokens)
+
+    def assign(field, value, *positions):
+        if values[field] is None and _in_range(field, value):
+            values[field] = float(value)
+            for pos in positions:
+                used[pos] = True
+            return True
+        return False
+
+    # 1) Multi-word temperature phrases ("bahut garam") before single words
+    for phrase, value in sorted(TEMPERATURE_PHRASES.items(), key=lambda kv: -len(kv[0].split())):
+        words = phrase.split()
+        for i in range(len(tokens) - len(words) + 1):
+            if tokens[i:i + len(words)] == words and not any(used[i:i + len(words)]):
+                assign("temperature", value, *range(i, i + len(words)))
+
+    # Drop intensifiers in front of level words so "bahut kam" == "kam";
+    # directly before rainfall they mean a lot of it ("bohot barish")
+    for i, tok in enumerate(tokens[:-1]):
+        if tok in INTENSIFIERS:
+            if tokens[i + 1] in _WORD_TO_LEVEL:
+                used[i] = True
+            elif _ALIAS_TO_FIELD.get(tokens[i + 1]) == "rainfall":
+                tokens[i] = "high"
+
+    # 2) Number + unit ("30°C", "200 mm", "30 degree")
+    for i, tok in enumerate(tokens[:-1]):
+        if _is_number(tok) and not used[i] and tokens[i + 1] in UNIT_FIELDS:
+            field, mult = UNIT_FIELDS[tokens[i + 1]]
+            assign(field, float(tok) * mult, i, i + 1)
+
+    # 3) "NPK 80 40 40" / "NPK 80-40-40"
+    for i, tok in enumerate(tokens):
+        if tok == "npk":
+            nums = [j for j in range(i + 1, min(i + 4, len(tokens))) if _is_number(tokens[j])]
+            if len(nums) == 3:
+                used[i] = True
+                for field, j in zip(("n", "p", "k"), nums):
+                    assign(field, float(tokens[j]), j)
+
+    # 4) Attach numbers / level words to the nearest field name
+    def field_before(i):
+        """Field name preceding token i within MAX_GAP tokens, same clause."""
+        gap = 0
+        for j in range(i - 1, -1, -1):
+            t = tokens[j]
+            if t in _BOUNDARIES:
+                return None
+            if t in _ALIAS_TO_FIELD:
+                return j
+            if _is_number(t) or t in _WORD_TO_LEVEL:
+                return None
+            gap += 1
+            if gap > MAX_GAP:
+                return None
+        return None
+
+    def field_after(i):
+        """Field name directly following token i ("kam barish", "80 nitrogen")."""
+        j = i + 1
+        if j < len(tokens) and tokens[j] in _ALIAS_TO_FIELD:
+            return j
+        return None
+
+    candidates = []  # (value token index, [field name positions])
+    for i, tok in enumerate(tokens):
+        if used[i] or not (_is_number(tok) or tok in _WORD_TO_LEVEL):
+            continue
+        options = [p for p in (field_before(i), field_after(i)) if p is not None]
+        if options:
+            candidates.append((i, options))
+
+    def value_for(field, tok):
+        if _is_number(tok):
+            return float(tok)
+        return LEVEL_VALUES.get(field, {}).get(_WORD_TO_LEVEL[tok])
+
+    def try_assign(i, pos):
+        field = _ALIAS_TO_FIELD[tokens[pos]]
+        value = value_for(field, tokens[i])
+        if value is not None and assign(field, value, i, pos):
+            return True
+        return False
+
+    # Unambiguous attachments first; they also tell us which side values sit on
+    before_votes = after_votes = 0
+    ambiguous = []
+    for i, options in candidates:
+        if len(options) == 1:
+            if try_assign(i, options[0]):
+                if options[0] < i:
+                    after_votes += 1
+                else:
+                    before_votes += 1
+        else:
+            ambiguous.append((i, options))
+
+    # "low nitrogen high phosphorus" vs "nitrogen low phosphorus high"
+    prefer_before_field = after_votes >= before_votes
+    for i, (prev_pos, next_pos) in ambiguous:
+        prev_free = values[_ALIAS_TO_FIELD[tokens[prev_pos]]] is None
+        next_free = values[_ALIAS_TO_FIELD[tokens[next_pos]]] is None
+        if prev_free and next_free:
+            order = (prev_pos, next_pos) if prefer_before_field else (next_pos, prev_pos)
+        else:
+            order = (prev_pos, next_pos)
+        for pos in order:
+            if try_assign(i, pos):
+                break
+
+    # A bare "80%" with no field name is humidity
+    for i, tok in enumerate(tokens[:-1]):
+        if _is_number(tok) and not used[i] and tokens[i + 1] == "%":
+            assign("humidity", float(tok), i, i + 1)
+
+    # 5) Anything parameter-like we did not consume is a hint for the LLM
+    leftover = []
+    for i, tok in enumerate(tokens):
+        if used[i]:
+            continue
+        if _is_number(tok) or tok in _WORD_TO_LEVEL or tok in INTENSIFIERS:
+            leftover.append(tok)
+        elif tok in _ALIAS_TO_FIELD and values[_ALIAS_TO_FIELD[tok]] is None:
+            leftover.append(tok)
+        elif tok in DESCRIPTIVE_WORDS:
+            leftover.append(tok)
+
+    extracted = any(v is not None for v in values.values())
+    free_text = not extracted and any(
+        not _is_number(tok) and tok not in _BOUNDARIES and tok not in SMALL_TALK_WORDS
+        for tok in tokens
+    )
+    return RuleParseResult(values, leftover, free_text)
+
+
+def render_level_tables() -> str:
+    """
+    Render the N/P/K level table in the format used by the extraction prompt,
+    so the LLM fallback and the local parser share one source of truth.
+    """
+    names = {"n": "NITROGEN (N)", "p": "PHOSPHORUS (P)", "k": "POTASSIUM (K)"}
+    labels = {"low": "low / kam", "medium": "medium / normal", "high": "high / zyada"}
+    blocks = []
+    for field, title in names.items():
+        lines = [f"  {title}:"]
+        for level, value in LEVEL_VALUES[field].items():
+            lines.append(f"    {labels[level]} = {value}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def render_vague_terms() -> str:
+    """Render the temperature / rainfall / humidity vague-term line for the prompt."""
+    t, r, h = LEVEL_VALUES["temperature"], LEVEL_VALUES["rainfall"], LEVEL_VALUES["humidity"]
+    return "\n".join([
+        f"        temperature: thanda/cool={t['low']}, garam/warm={t['high']}, "
+        f"bahut garam/very hot={TEMPERATURE_PHRASES['bahut garam']}",
+        f"        rainfall: kam barish={r['low']}, normal barish={r['medium']}, "
+        f"zyada barish/bohot barish={r['high']}",
+        f"        humidity: kam={h['low']}, medium={h['medium']}, zyada={h['high']}",
+    ])
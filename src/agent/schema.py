@@ -11,6 +11,9 @@ class AgentState(BaseModel):
     # Parameters extracted from all messages so far
     extracted_params: Optional[Dict[str, Any]] = None
 
+    # Parameters given in the latest message
+    new_fields: Optional[List[str]] = None
+
     # Which parameters are still missing
     missing_fields: Optional[List[str]] = None
 
@@ -20,9 +23,20 @@ class AgentState(BaseModel):
     # Results from crop recommendation tool
     crop_results: Optional[List[Dict[str, Any]]] = None
 
-    # Retrieved RAG documents
+    # Retrieved RAG chunk references (chunk_id, source, topic, score);
+    # texts are read from the doc store when the answer prompt is built
     rag_results: Optional[List[Dict[str, Any]]] = None
 
+    # Tokens of retrieved context that went into the answer prompt
+    context_tokens: Optional[int] = None
+
     # Final answer or follow-up question to user
     answer: Optional[str] = None
 
+    # Reply language detected from the latest message ("en", "hinglish", "hi")
+    language: Optional[str] = None
+
+    # Answer cache key for this turn, and whether the answer came from the cache
+    cache_key: Optional[str] = None
+    answer_cached: bool = False
+
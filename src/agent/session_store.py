@@ -0,0 +1,184 @@
+# src/agent/session_store.py
+
+"""
+Compact per-session conversation state.
+
+Between turns the agent only needs the durable facts of a conversation
+(DURABLE_FIELDS): the field parameters known so far, which of them are
+still missing and the reply language. Crop scores, retrieved documents
+and the previous answer are recomputed every turn, so they are not kept.
+
+Facts live in an in-memory LRU in front of a sqlite file, so sessions
+survive restarts while memory per process stays bounded. Sessions idle
+for longer than the TTL are dropped.
+
+Configuration:
+    AGROSENSE_SESSION_DB     sqlite path (default data/sessions.sqlite3, "" = memory only)
+    AGROSENSE_SESSION_TTL    idle seconds before a session expires (default 7 days)
+    AGROSENSE_SESSION_ITEMS  sessions kept in memory (default 1024)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# project root = two levels up from this file
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SESSION_DB_PATH = os.path.join(ROOT, "data", "sessions.sqlite3")
+
+# AgentState fields carried from one turn to the next
+DURABLE_FIELDS = ("extracted_params", "missing_fields", "language")
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MEMORY_ITEMS = 1024
+# Expired rows are purged from sqlite at most this often
+PURGE_INTERVAL = 600
+
+
+def durable_facts(state: Optional[dict]) -> dict:
+    """The part of a turn's final state that the next turn needs."""
+    state = state or {}
+    return {field: state.get(field) for field in DURABLE_FIELDS if state.get(field) is not None}
+
+
+class SessionStore:
+    """
+    TTL + LRU store of durable facts per session id, with an optional sqlite tier.
+    Thread-safe.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = SESSION_DB_PATH,
+        ttl: float = DEFAULT_TTL,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.memory_items = memory_items
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # session_id -> (expires_at, facts)
+        self._conn = None
+        self._last_purge = 0.0
+
+    def _db(self):
+        if self.path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " facts TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, session_id, expires_at, facts):
+        self._memory[session_id] = (expires_at, facts)
+        self._memory.move_to_end(session_id)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _purge(self, conn, now):
+        if now - self._last_purge >= PURGE_INTERVAL:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            self._last_purge = now
+
+    def load(self, session_id: str) -> dict:
+        """Durable facts of this session ({} for new or expired sessions)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(session_id)
+            if entry is not None:
+                expires_at, facts = entry
+                if expires_at > now:
+                    self._memory.move_to_end(session_id)
+                    return dict(facts)
+                del self._memory[session_id]
+
+            conn = self._db()
+            if conn is None:
+                return {}
+            row = conn.execute(
+                "SELECT facts, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return {}
+            facts = json.loads(row[0])
+            self._remember(session_id, row[1], facts)
+            return dict(facts)
+
+    def save(self, session_id: str, state: Optional[dict]) -> dict:
+        """Keep the durable facts of a turn's final state; returns what was stored."""
+        facts = durable_facts(state)
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(session_id, expires_at, facts)
+
+            conn = self._db()
+            if conn is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, facts, expires_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(facts, ensure_ascii=False), expires_at),
+                )
+                self._purge(conn, now)
+                conn.commit()
+        return facts
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._memory.pop(session_id, None)
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"memory_items": len(self._memory)}
+            conn = self._db()
+            if conn is not None:
+                stats["disk_items"] = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _env_number(name, default, cast):
+    try:
+        return cast(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide session store (see module docstring for configuration)."""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = SessionStore(
+                    path=os.getenv("AGROSENSE_SESSION_DB", SESSION_DB_PATH) or None,
+                    ttl=_env_number("AGROSENSE_SESSION_TTL", DEFAULT_TTL, float),
+                    memory_items=_env_number("AGROSENSE_SESSION_ITEMS", DEFAULT_MEMORY_ITEMS, int),
+                )
+    return _default_store
@@ -0,0 +1,33 @@
+# src/agent/test_rule_parser.py
+
+from agent.rule_parser import parse_parameters
+
+# message -> (fields the rules must extract, whether the LLM is still needed)
+CASES = {
+    "N 80 P 40 K 40 ph 6.5 temp 28 humidity 80 rainfall 200": ({"n", "p", "k", "ph", "temperature", "humidity", "rainfall"}, False),
+    "N 80 P 40 K 40 ph 6.5 temp 28 and rainfall 200": ({"n", "p", "k", "ph", "temperature", "rainfall"}, False),
+    "nitrogen kam hai": ({"n"}, False),
+    "hello": (set(), False),
+    "thanks!": (set(), False),
+    "it's humid and rains a lot here": (set(), True),
+    # Numbers plus a description: the description must not be dropped
+    "temperature 28 and it rains heavily here, soil ph 6": ({"temperature", "ph"}, True),
+    "N 80 and the soil is sandy": ({"n"}, True),
+}
+
+
+def main():
+    print("Testing the rule parser...")
+    failures = 0
+    for text, (fields, needs_llm) in CASES.items():
+        result = parse_parameters(text)
+        got = {k for k, v in result.values.items() if v is not None}
+        ok = got == fields and result.needs_llm == needs_llm
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {text!r}: {sorted(got)} needs_llm={result.needs_llm} hints={result.leftover_hints}")
+    assert failures == 0, f"{failures} case(s) failed"
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
 # src/agent/tools.py
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from agent.schema import AgentState
-from tools.crop_recommender import load_crop_profiles
-from rag.retriever import retrieve_agri_docs
+from tools.crop_recommender import recommend_crops_batch
+from rag.retriever import retrieve_agri_docs, aretrieve_agri_docs, retrieve_topic_docs
+from tracing import in_context
+
+# Chunks to retrieve; the context assembler trims them to the token budget
+RAG_TOP_K = 8
+# Direct topic lookup: the first chunks of the best few crops; the
+# remaining slots go to the search on the user's query
+DIRECT_CROPS = 3
+DIRECT_CHUNKS_PER_CROP = 2
 
 
 def tool_crop_recommendation(state: AgentState) -> dict:
@@ -12,55 +23,58 @@ def tool_crop_recommendation(state: AgentState) -> dict:
     """
     params = state.extracted_params or {}
 
-    user_vec = {}
-
-    mapping = {
-        "n": "ideal_n",
-        "p": "ideal_p",
-        "k": "ideal_k",
-        "temperature": "ideal_temp",
-        "humidity": "ideal_humidity",
-        "ph": "ideal_ph",
-        "rainfall": "ideal_rainfall",
-    }
-
-    for key, target in mapping.items():
-        val = params.get(key)
-        if val is not None:
-            user_vec[target] = float(val)
-
-    df = load_crop_profiles()
-
-    scored = []
-    for _, row in df.iterrows():
-        ideal = {
-            "ideal_n": row["ideal_n"],
-            "ideal_p": row["ideal_p"],
-            "ideal_k": row["ideal_k"],
-            "ideal_temp": row["ideal_temp"],
-            "ideal_humidity": row["ideal_humidity"],
-            "ideal_ph": row["ideal_ph"],
-            "ideal_rainfall": row["ideal_rainfall"],
-        }
-
-        score = 0.0
-        for key, user_val in user_vec.items():
-            ideal_val = ideal.get(key)
-            if ideal_val is not None:
-                score += abs(user_val - ideal_val)
-
-        scored.append((row["crop"], score))
-
-    scored_sorted = sorted(scored, key=lambda x: x[1])
-    results = [{"crop": c, "score": s} for c, s in scored_sorted[:5]]
+    ranked = recommend_crops_batch([params], top_k=5)[0]
+    results = [{"crop": c, "score": s} for c, s in ranked]
 
     return {"crop_results": results}
 
 
+def _crop_notes(state: AgentState):
+    """Opening notes of the top recommended crops by direct topic lookup, best crop first."""
+    crops = [c["crop"] for c in (state.crop_results or [])[:DIRECT_CROPS]]
+    return retrieve_topic_docs(crops, k=RAG_TOP_K, per_topic=DIRECT_CHUNKS_PER_CROP)
+
+
+def _fill_remaining(direct, found):
+    """
+    Append search results not already looked up, up to RAG_TOP_K in total.
+    The order is the priority: the context assembler packs chunks as they
+    come and cuts from the end, so the recommended crops' own notes (which
+    carry no score) are kept first.
+    """
+    taken = {d.get("chunk_id") or d.get("source") for d in direct}
+    extra = [d for d in found if (d.get("chunk_id") or d.get("source")) not in taken]
+    return direct + extra[:RAG_TOP_K - len(direct)]
+
+
 def tool_rag_retrieve(state: AgentState) -> dict:
     """
-    Query the RAG index using the user's query text.
+    A few notes for the top recommended crops come from the topic index;
+    the rest of the slots are filled by searching the user's query.
+    The topic lookup runs in a worker thread while the query is searched.
     """
-    docs = retrieve_agri_docs(state.query, k=5)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        notes = pool.submit(in_context(_crop_notes), state)
+        found = retrieve_agri_docs(state.query, k=RAG_TOP_K)
+        docs = _fill_remaining(notes.result(), found)
     return {"rag_results": docs}
 
+
+async def atool_crop_recommendation(state: AgentState) -> dict:
+    """
+    Async entry point for the graph. Scoring is a sub-millisecond NumPy pass,
+    so it simply runs inline.
+    """
+    return tool_crop_recommendation(state)
+
+
+async def atool_rag_retrieve(state: AgentState) -> dict:
+    """
+    Async version of tool_rag_retrieve (non-blocking query embedding,
+    the topic lookup runs concurrently in a worker thread).
+    """
+    direct, found = await asyncio.gather(
+        asyncio.to_thread(_crop_notes, state),
+        aretrieve_agri_docs(state.query, k=RAG_TOP_K),
+    )
+    return {"rag_results": _fill_remaining(direct, found)}
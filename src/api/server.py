@@ -0,0 +1,369 @@
+# src/api/server.py
+
+"""
+Headless async HTTP API for the AgroSense agent.
+
+Endpoints:
+    POST   /chat                  one chat turn; {"stream": true} returns NDJSON
+    POST   /sessions              start a session -> {"session_id": ...}
+    DELETE /sessions/{session_id} forget a session (409 while one of its turns runs)
+    POST   /stt                   raw audio body -> {"text": ...}
+    POST   /tts                   {"text": ..., "format": "mp3"} -> audio stream
+    GET    /healthz               liveness + load
+    GET    /metrics               tracing metrics in Prometheus text format
+
+Conversation facts stay on the server (agent.session_store, sqlite-backed,
+so sessions survive restarts). Turns of one session run in order (api.sessions); at most AGROSENSE_API_MAX_CONCURRENCY turns / audio
+requests run at once across all sessions, the rest wait up to
+AGROSENSE_API_QUEUE_TIMEOUT seconds (for their session and a slot
+together) and then get 503. Slots and session locks are released when
+the response is finished, also if the client disconnects early.
+
+Streaming (/chat with "stream": true) sends one JSON object per line:
+    {"type": "token", "text": "..."}       reply text as it is generated
+    {"type": "done", ...}                  same fields as the non-streaming reply
+    {"type": "error", "detail": "..."}     the turn failed
+
+Configuration:
+    AGROSENSE_API_MAX_CONCURRENCY   concurrent turns (default 8)
+    AGROSENSE_API_QUEUE_TIMEOUT     seconds to wait for a slot (default 30)
+    AGROSENSE_API_SESSION_TTL       idle seconds before a session lock is dropped (default 3600)
+    AGROSENSE_API_MAX_SESSIONS      session locks kept in memory (default 10000)
+    AGROSENSE_SESSION_*             session fact storage, see agent.session_store
+    AGROSENSE_API_FAKE              "1" uses the offline fakes from benchmarks.fakes
+
+Run from src/:
+    python -m api.server --port 8000
+    python -m api.server --fake          # no API key needed
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Iterator, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+import audio_utils
+from agent.session_store import SessionStore, get_session_store
+from api.sessions import DEFAULT_MAX_SESSIONS, DEFAULT_TTL, Session, SessionRegistry
+from tracing import tracer
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_QUEUE_TIMEOUT = 30.0
+
+# Fields of the final agent state returned to clients
+REPLY_FIELDS = (
+    "answer",
+    "extracted_params",
+    "missing_fields",
+    "needs_more_info",
+    "crop_results",
+    "answer_cached",
+    "context_tokens",
+)
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(min_length=1)
+    session_id: Optional[str] = None
+    stream: bool = False
+
+
+class TTSRequest(BaseModel):
+    text: str = Field(min_length=1)
+    format: str = "mp3"
+
+
+def _env_number(name, default, cast):
+    try:
+        return cast(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _once(*funcs) -> Callable[[], None]:
+    """A callable that runs `funcs` on its first call only."""
+    done = False
+
+    def run():
+        nonlocal done
+        if not done:
+            done = True
+            for func in funcs:
+                func()
+
+    return run
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls `release` when it is finished with the
+    request, also when the client is gone before the body generator ever
+    started (its own `finally` would then never run).
+    """
+
+    def __init__(self, content, release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+
+def _reply(session: Session, result: Optional[dict], timings: dict) -> dict:
+    result = result or {}
+    return {
+        "session_id": session.session_id,
+        **{field: result.get(field) for field in REPLY_FIELDS},
+        "timings": timings,
+    }
+
+
+def create_app(
+    max_concurrency: Optional[int] = None,
+    queue_timeout: Optional[float] = None,
+    sessions: Optional[SessionRegistry] = None,
+    store: Optional[SessionStore] = None,
+    fake: Optional[bool] = None,
+    speech_to_text: Optional[Callable[..., str]] = None,
+    text_to_speech_stream: Optional[Callable[..., Iterator[bytes]]] = None,
+) -> FastAPI:
+    """
+    Build the API app. Arguments default to the AGROSENSE_API_* settings.
+    With fake=True every model backend (chat, embeddings, STT, TTS) is
+    replaced by the deterministic fakes, a throwaway RAG index is built in
+    a temp dir and sessions / caches stay in memory, so the service runs
+    offline and never touches data/.
+    speech_to_text / text_to_speech_stream override the audio backends
+    (same signatures as the audio_utils functions).
+    """
+    if fake is None:
+        fake = os.getenv("AGROSENSE_API_FAKE", "0") == "1"
+    work_dir = None
+    if fake:
+        from benchmarks import fakes
+
+        # Throwaway index and in-memory caches: the shipped index cannot be
+        # queried with fake embeddings, and data/ must stay untouched
+        work_dir = tempfile.mkdtemp(prefix="agrosense_api_fake_")
+        fakes.prepare_environment(work_dir)
+        store = store or SessionStore(path=None)
+        speech_to_text = speech_to_text or fakes.fake_speech_to_text
+        text_to_speech_stream = text_to_speech_stream or fakes.fake_text_to_speech_stream
+
+    speech_to_text = speech_to_text or audio_utils.speech_to_text_from_bytes
+    text_to_speech_stream = text_to_speech_stream or audio_utils.text_to_speech_stream
+
+    max_concurrency = max_concurrency or _env_number("AGROSENSE_API_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY, int)
+    queue_timeout = queue_timeout or _env_number("AGROSENSE_API_QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT, float)
+    sessions = sessions or SessionRegistry(
+        ttl=_env_number("AGROSENSE_API_SESSION_TTL", DEFAULT_TTL, float),
+        max_sessions=_env_number("AGROSENSE_API_MAX_SESSIONS", DEFAULT_MAX_SESSIONS, int),
+    )
+    store = store or get_session_store()
+
+    # Imported here so create_app(fake=True) installs the fakes first
+    from agent.graph import AnswerStream, graph
+    from llm_clients import registry
+
+    slots = asyncio.Semaphore(max_concurrency)
+    load = {"active": 0, "waiting": 0}
+
+    async def acquire_slot(timeout: Optional[float] = None):
+        """Take one of the max_concurrency execution slots, or raise 503 after queue_timeout."""
+        load["waiting"] += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=queue_timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="server busy, try again")
+        finally:
+            load["waiting"] -= 1
+        load["active"] += 1
+
+    def release_slot():
+        load["active"] -= 1
+        slots.release()
+
+    async def acquire_turn(session: Session):
+        """
+        The session's lock, then a slot. Both waits together are bounded by
+        queue_timeout, after which the request gets 503.
+        """
+        deadline = time.monotonic() + queue_timeout
+        try:
+            await asyncio.wait_for(session.lock.acquire(), timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="previous turn of this session still running, try again")
+        try:
+            await acquire_slot(max(0.0, deadline - time.monotonic()))
+        except BaseException:
+            session.lock.release()
+            raise
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await registry.aclose()
+        if work_dir is not None:
+            from rag.retriever import close_vectordb
+
+            close_vectordb()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    app = FastAPI(title="AgroSense API", lifespan=lifespan)
+    app.state.sessions = sessions
+    app.state.store = store
+    app.state.graph = graph
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok", "sessions": len(sessions), **load, "max_concurrency": max_concurrency}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(tracer.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/sessions")
+    async def create_session():
+        return {"session_id": sessions.create().session_id}
+
+    @app.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str):
+        active = sessions.get(session_id)
+        if active is not None and active.lock.locked():
+            # Dropping the lock entry now would let the next turn overtake this one
+            raise HTTPException(status_code=409, detail="a turn of this session is in progress")
+        known = sessions.delete(session_id) or bool(await run_in_threadpool(store.load, session_id))
+        if not known:
+            raise HTTPException(status_code=404, detail="unknown session")
+        await run_in_threadpool(store.delete, session_id)
+        return {"deleted": session_id}
+
+    @app.post("/chat")
+    async def chat(req: ChatRequest):
+        session = sessions.get_or_create(req.session_id)
+
+        async def run_turn(stream: AnswerStream):
+            """Yield reply tokens; updates the session once the turn is complete."""
+            async for text in stream:
+                yield text
+            if stream.result:
+                await run_in_threadpool(store.save, session.session_id, stream.result)
+                session.turns += 1
+            session.last_used = time.monotonic()
+
+        # Waiting for the session / a slot happens before the response starts,
+        # so a busy server answers 503 instead of a broken stream
+        await acquire_turn(session)
+        release = _once(release_slot, session.lock.release)
+
+        try:
+            facts = await run_in_threadpool(store.load, session.session_id)
+        except BaseException:
+            release()
+            raise
+        stream = AnswerStream({**facts, "query": req.message})
+        if not req.stream:
+            try:
+                async for _ in run_turn(stream):
+                    pass
+            finally:
+                release()
+            return _reply(session, stream.result, stream.timings)
+
+        async def ndjson():
+            try:
+                async for text in run_turn(stream):
+                    yield json.dumps({"type": "token", "text": text}, ensure_ascii=False) + "\n"
+                done = {"type": "done", **_reply(session, stream.result, stream.timings)}
+                yield json.dumps(done, ensure_ascii=False) + "\n"
+            except Exception as e:
+                print("API chat error:", repr(e))
+                yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+            finally:
+                release()
+
+        return ReleasingStreamingResponse(ndjson(), release, media_type="application/x-ndjson")
+
+    @app.post("/stt")
+    async def stt(request: Request, preprocess: bool = True):
+        audio = await request.body()
+        if not audio:
+            raise HTTPException(status_code=400, detail="empty audio body")
+        await acquire_slot()
+        try:
+            text = await run_in_threadpool(speech_to_text, audio, preprocess)
+        finally:
+            release_slot()
+        return {"text": text}
+
+    @app.post("/tts")
+    async def tts(req: TTSRequest):
+        if req.format not in audio_utils.AUDIO_MIME_TYPES:
+            raise HTTPException(status_code=400, detail=f"format must be one of {sorted(audio_utils.AUDIO_MIME_TYPES)}")
+        await acquire_slot()
+        chunks = text_to_speech_stream(req.text, req.format)
+
+        def close_chunks():
+            try:
+                chunks.close()
+            except ValueError:
+                pass  # still running in a worker thread; it is dropped with the response
+
+        release = _once(close_chunks, release_slot)
+        try:
+            first = await run_in_threadpool(next, chunks, None)
+        except audio_utils.TTSError:
+            first = None
+        except BaseException:
+            release()
+            raise
+        if first is None:
+            release()
+            raise HTTPException(status_code=502, detail="speech synthesis failed")
+
+        async def audio():
+            # Later segments are synthesized concurrently while earlier ones are sent.
+            # The status is already out when a later segment fails: TTSError then
+            # aborts the response, so the client sees a broken stream, not a gap.
+            try:
+                chunk = first
+                while chunk is not None:
+                    yield chunk
+                    chunk = await run_in_threadpool(next, chunks, None)
+            finally:
+                release()
+
+        return ReleasingStreamingResponse(audio(), release, media_type=audio_utils.AUDIO_MIME_TYPES[req.format])
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the AgroSense agent over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fake", action="store_true", help="offline fake model backends (no API key)")
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(max_concurrency=args.max_concurrency, fake=args.fake or None)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# src/api/sessions.py
+
+"""
+Per-session turn ordering for the HTTP API.
+
+Each active session gets an asyncio.Lock, so turns of one session run
+strictly one after another while different sessions run concurrently.
+The conversation facts themselves live in agent.session_store, so a
+session id keeps working after its entry here expired or the server
+restarted.
+
+Idle entries expire after `ttl` seconds; at most `max_sessions` are kept
+(least recently used sessions that are not mid-turn are dropped first).
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_SESSIONS = 10_000
+
+
+class Session:
+    __slots__ = ("session_id", "lock", "last_used", "turns")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.turns = 0
+
+
+class SessionRegistry:
+    """In-process table of session locks. Use from one event loop."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire(self, room: int = 0):
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if len(self._sessions) + room <= self.max_sessions and now - session.last_used <= self.ttl:
+                break  # ordered by last use: the rest are fresher
+            if not session.lock.locked():
+                del self._sessions[session_id]
+
+    def get(self, session_id: str) -> Optional[Session]:
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def create(self, session_id: Optional[str] = None) -> Session:
+        self._expire(room=1)
+        session = Session(session_id or uuid.uuid4().hex)
+        self._sessions[session.session_id] = session
+        return session
+
+    def get_or_create(self, session_id: Optional[str]) -> Session:
+        if session_id:
+            session = self.get(session_id)
+            if session is not None:
+                return session
+        return self.create(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Forget an idle session; a session mid-turn is kept (False)."""
+        session = self._sessions.get(session_id)
+        if session is None or session.lock.locked():
+            return False
+        del self._sessions[session_id]
+        return True
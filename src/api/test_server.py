@@ -0,0 +1,110 @@
+# src/api/test_server.py
+
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from api.server import create_app
+from audio_utils import TTSError
+
+FULL_QUERY = "N 80 P 40 K 40 ph 6.5 temp 28 humidity 80 rainfall 200"
+
+
+async def _disconnect_early(app, path: str, body: dict):
+    """POST to `app` as a client that goes away as soon as the response starts."""
+    messages = [{"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise ConnectionResetError("client disconnected")
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        pass
+
+
+async def _check_early_disconnect():
+    """A client that leaves before the body starts must not keep its slot or session lock."""
+    app = create_app(fake=True, max_concurrency=1, queue_timeout=2)
+    await _disconnect_early(app, "/chat", {"message": FULL_QUERY, "session_id": "gone", "stream": True})
+    await _disconnect_early(app, "/tts", {"text": "Hello there. Second sentence."})
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        other = await client.post("/chat", json={"message": FULL_QUERY, "session_id": "other"})
+        same = await client.post("/chat", json={"message": FULL_QUERY, "session_id": "gone"})
+        health = (await client.get("/healthz")).json()
+    print("After early disconnects:", other.status_code, same.status_code, health)
+    assert other.status_code == 200 and same.status_code == 200, (other.text, same.text)
+    assert health["active"] == 0, health
+
+
+def _failing_tts(fail_at: int):
+    """A text_to_speech_stream whose segment number `fail_at` (0-based) fails."""
+    def stream(text, audio_format="mp3", max_workers=3):
+        for i, sentence in enumerate(text.split(". ")):
+            if i == fail_at:
+                raise TTSError(f"segment {i} failed")
+            yield sentence.encode("utf-8")
+    return stream
+
+
+def _check_tts_failure():
+    """A failed segment must surface as an error, never as audio with a gap."""
+    with TestClient(create_app(fake=True, text_to_speech_stream=_failing_tts(0))) as client:
+        reply = client.post("/tts", json={"text": "Hello there. Second sentence."})
+        print("TTS, first segment fails:", reply.status_code)
+        assert reply.status_code == 502, reply.status_code
+
+    with TestClient(create_app(fake=True, text_to_speech_stream=_failing_tts(1))) as client:
+        try:
+            client.post("/tts", json={"text": "Hello there. Second sentence."})
+        except TTSError:
+            print("TTS, second segment fails: stream aborted")
+        else:
+            raise AssertionError("expected the stream to be aborted")
+        assert client.get("/healthz").json()["active"] == 0
+
+
+def main():
+    print("Testing the API in fake mode (offline, temp index)...")
+
+    with TestClient(create_app(fake=True)) as client:
+        reply = client.post("/chat", json={"message": FULL_QUERY})
+        assert reply.status_code == 200, reply.text
+        data = reply.json()
+
+        print("Session:", data["session_id"])
+        print("Crops  :", [c["crop"] for c in data["crop_results"] or []])
+        print("Answer :", data["answer"][:200])
+        assert data["crop_results"], "expected crop recommendations for a full query"
+        assert data["answer"], "expected an answer"
+
+        lines = []
+        with client.stream("POST", "/chat", json={"message": FULL_QUERY, "stream": True}) as stream:
+            for line in stream.iter_lines():
+                if line:
+                    lines.append(line)
+        assert '"type": "done"' in lines[-1], lines[-1]
+        print("Streamed", len(lines), "lines")
+
+    _check_tts_failure()
+    asyncio.run(_check_early_disconnect())
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
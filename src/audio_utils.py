@@ -1,40 +1,201 @@
 # src/audio_utils.py
 
+import hashlib
 import io
-from typing import Optional
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 
-from openai import OpenAI
+from tracing import in_context, span
 
-client = OpenAI()  # Uses OPENAI_API_KEY from env
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Shared OpenAI client for STT / TTS, created on first use (uses
+    OPENAI_API_KEY from env). The openai package takes almost a second to
+    import, so it is not loaded with this module.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+
+                _client = OpenAI()
+    return _client
+
+
+def __getattr__(name):
+    # Older callers use the module-level `client`
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# =========================================================
+# 🎚️ AUDIO PREPROCESSING (before STT)
+# =========================================================
+
+TARGET_SAMPLE_RATE = 16000      # what speech models work at anyway
+VAD_FRAME_MS = 30               # energy is measured per 30 ms frame
+VAD_PADDING_MS = 200            # keep a little audio around detected speech
+VAD_MIN_RMS = 150               # absolute floor (int16) below which a frame is silence
+VAD_RELATIVE_RMS = 0.05         # ... or below 5% of the loudest frame
+OPUS_BITRATE = 24000            # plenty for 16 kHz mono speech
+
+
+def _trim_silence(samples, rate: int):
+    """
+    Simple energy-based VAD: drop leading/trailing frames whose RMS is below
+    max(VAD_MIN_RMS, VAD_RELATIVE_RMS * loudest frame). Returns the trimmed
+    samples (empty if nothing sounded like speech).
+    """
+    import numpy as np
+
+    frame = max(1, rate * VAD_FRAME_MS // 1000)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return samples
+
+    frames = samples[: n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+    rms = np.sqrt((frames ** 2).mean(axis=1))
+    threshold = max(VAD_MIN_RMS, VAD_RELATIVE_RMS * float(rms.max()))
+    voiced = np.flatnonzero(rms >= threshold)
+    if voiced.size == 0:
+        return samples[:0]
+
+    pad = VAD_PADDING_MS * rate // 1000
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def _encode_opus(samples, rate: int) -> bytes:
+    import av
+
+    out = io.BytesIO()
+    with av.open(out, mode="w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=rate, layout="mono")
+        stream.bit_rate = OPUS_BITRATE
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return out.getvalue()
+
+
+def preprocess_audio(audio_bytes: bytes, filename: str = "recording.webm"):
+    """
+    Prepare recorded audio for upload: decode, downmix to mono, resample to
+    16 kHz, trim leading/trailing silence and re-encode as Ogg/Opus.
+
+    Returns (bytes, filename, report). The original bytes are returned
+    unchanged if PyAV is not installed, decoding fails, or the result would
+    not be smaller. The report has input/output sizes, bytes_saved,
+    durations and elapsed_ms.
+    """
+    t0 = time.perf_counter()
+    report = {
+        "applied": False,
+        "input_bytes": len(audio_bytes),
+        "output_bytes": len(audio_bytes),
+        "bytes_saved": 0,
+        "duration_in_s": None,
+        "duration_out_s": None,
+        "elapsed_ms": 0.0,
+    }
+
+    def done(data, name):
+        report["output_bytes"] = len(data)
+        report["bytes_saved"] = len(audio_bytes) - len(data)
+        report["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+        print("STT preprocess:", report)
+        return data, name, report
+
+    try:
+        import av
+        import numpy as np
+    except ImportError:
+        report["reason"] = "PyAV not installed"
+        return done(audio_bytes, filename)
+
+    try:
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=TARGET_SAMPLE_RATE)
+        chunks = []
+        with av.open(io.BytesIO(audio_bytes)) as container:
+            for frame in container.decode(audio=0):
+                for out in resampler.resample(frame):
+                    chunks.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1))
+        samples = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+        report["duration_in_s"] = len(samples) / TARGET_SAMPLE_RATE
+
+        trimmed = _trim_silence(samples, TARGET_SAMPLE_RATE)
+        report["duration_out_s"] = len(trimmed) / TARGET_SAMPLE_RATE
+        if len(trimmed) == 0:
+            report["applied"] = True
+            report["reason"] = "no speech detected"
+            return done(b"", filename)
+
+        encoded = _encode_opus(np.ascontiguousarray(trimmed, dtype=np.int16), TARGET_SAMPLE_RATE)
+    except Exception as e:
+        report["reason"] = f"preprocess failed: {e!r}"
+        return done(audio_bytes, filename)
+
+    if len(encoded) >= len(audio_bytes):
+        report["reason"] = "re-encoded audio not smaller"
+        return done(audio_bytes, filename)
+
+    report["applied"] = True
+    return done(encoded, "recording.ogg")
 
 
 # =========================================================
 # 🔊 SPEECH → TEXT (STT)
 # =========================================================
 
-def speech_to_text_from_bytes(audio_bytes: bytes) -> str:
+def speech_to_text_from_bytes(audio_bytes: bytes, preprocess: bool = True) -> str:
     """
     Convert raw audio bytes into Hindi/Hinglish/English text.
     Try to avoid Urdu/Nastaliq script in output.
+    With preprocess=True the audio is trimmed and compressed before upload.
     """
     if not audio_bytes:
         return ""
 
+    filename = "recording.webm"
+    if preprocess:
+        audio_bytes, filename, _ = preprocess_audio(audio_bytes, filename)
+        if not audio_bytes:
+            # Only silence was recorded; nothing to transcribe
+            return ""
+
     try:
         audio_file = io.BytesIO(audio_bytes)
-        audio_file.name = "recording.webm"
-
-        resp = client.audio.transcriptions.create(
-            model="gpt-4o-mini-transcribe",
-            file=audio_file,
-            language="hi",  # bias towards Hindi instead of Urdu
-            prompt=(
-                "Transcribe the speech into either Hindi in Devanagari, "
-                "Hinglish (Hindi written with English letters), or English. "
-                "Do NOT use Urdu / Arabic / Nastaliq script."
-            ),
-            response_format="text",
-        )
+        audio_file.name = filename
+
+        with span("stt", "gpt-4o-mini-transcribe", bytes_in=len(audio_bytes)):
+            resp = get_client().audio.transcriptions.create(
+                model="gpt-4o-mini-transcribe",
+                file=audio_file,
+                language="hi",  # bias towards Hindi instead of Urdu
+                prompt=(
+                    "Transcribe the speech into either Hindi in Devanagari, "
+                    "Hinglish (Hindi written with English letters), or English. "
+                    "Do NOT use Urdu / Arabic / Nastaliq script."
+                ),
+                response_format="text",
+            )
 
         if isinstance(resp, str):
             return resp.strip()
@@ -48,6 +209,167 @@ def speech_to_text_from_bytes(audio_bytes: bytes) -> str:
         return ""
 
 
+# =========================================================
+# 🗄️ TTS AUDIO CACHE (content-addressed)
+# =========================================================
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TTS_CACHE_DIR = os.path.join(ROOT, "data", "tts_cache")
+
+
+class AudioCache:
+    """
+    Content-addressed cache for synthesized audio.
+
+    Key = sha256(text, model, voice, format). Entries live in an in-memory
+    LRU and as files under TTS_CACHE_DIR; both tiers are bounded by total
+    bytes and evict least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = TTS_CACHE_DIR,
+        memory_bytes: int = 32 * 1024 * 1024,
+        disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = None  # key -> (size, last_used); loaded lazily
+        self._disk_size = 0
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.bytes_served = 0
+
+    @staticmethod
+    def make_key(text: str, model: str, voice: str, audio_format: str) -> str:
+        payload = "\x00".join([model, voice, audio_format, text])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_disk_index(self):
+        if self._disk is not None or self.directory is None:
+            return
+        self._disk = {}
+        self._disk_size = 0
+        if not os.path.isdir(self.directory):
+            return
+        for sub in os.listdir(self.directory):
+            subdir = os.path.join(self.directory, sub)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                st = os.stat(os.path.join(subdir, name))
+                self._disk[name] = (st.st_size, st.st_mtime)
+                self._disk_size += st.st_size
+
+    def _remember(self, key: str, data: bytes):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        if len(data) > self.memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self):
+        if self._disk_size <= self.disk_bytes:
+            return
+        for key, (size, _) in sorted(self._disk.items(), key=lambda kv: kv[1][1]):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._disk[key]
+            self._disk_size -= size
+            if self._disk_size <= self.disk_bytes * 0.9:
+                break
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                self.bytes_served += len(data)
+                return data
+
+            self._load_disk_index()
+            if self._disk and key in self._disk:
+                now = time.time()
+                try:
+                    with open(self._path(key), "rb") as f:
+                        data = f.read()
+                    # Touch for LRU eviction; the file may have been evicted
+                    # by another process since it was read
+                    os.utime(self._path(key), (now, now))
+                except OSError:
+                    entry = self._disk.pop(key, None)
+                    if entry is not None:
+                        self._disk_size -= entry[0]
+                    data = None
+                if data is not None:
+                    self._disk[key] = (len(data), now)
+                    self._remember(key, data)
+                    self.hits_disk += 1
+                    self.bytes_served += len(data)
+                    return data
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: bytes):
+        if not data:
+            return
+        with self._lock:
+            self._remember(key, data)
+
+            self._load_disk_index()
+            if self._disk is None or key in self._disk:
+                return
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                print("TTS cache write error:", repr(e))
+                return
+            self._disk[key] = (len(data), time.time())
+            self._disk_size += len(data)
+            self._evict_disk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+                "disk_items": len(self._disk or {}),
+            }
+
+
+tts_cache = AudioCache()
+
+
 # =========================================================
 # 🔉 TEXT → SPEECH (TTS)
 # =========================================================
@@ -82,38 +404,64 @@ def _extract_audio_bytes(response) -> Optional[bytes]:
     return None
 
 
-def text_to_speech_bytes(text: str) -> Optional[bytes]:
+# Output formats supported by the TTS endpoint and their MIME types.
+# "opus" is the compact choice for low-bandwidth clients.
+AUDIO_MIME_TYPES = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+}
+
+TTS_MODEL = "gpt-4o-mini-tts"   # if this model is unavailable, you can try "tts-1"
+TTS_VOICE = "alloy"
+
+
+def _synthesize(text: str, audio_format: str = "mp3") -> bytes:
     """
-    Convert text into MP3 audio using OpenAI TTS.
-    Tries both the "old" and "new" API styles for compatibility.
+    Audio for one piece of text, served from tts_cache when possible.
     """
-    text = (text or "").strip()
-    if not text:
-        return b""
+    key = AudioCache.make_key(text, TTS_MODEL, TTS_VOICE, audio_format)
+    with span("tts", TTS_MODEL, chars=len(text), format=audio_format) as s:
+        audio = tts_cache.get(key)
+        s.set(cache_hit=audio is not None)
+        if audio is None:
+            audio = _synthesize_uncached(text, audio_format)
+            tts_cache.put(key, audio)
+        s.set(bytes_out=len(audio))
+    return audio
 
-    # First try: some SDKs expect `format="mp3"` and return a streaming object
+
+def _synthesize_uncached(text: str, audio_format: str = "mp3") -> bytes:
+    """
+    One TTS request. Tries both the "new" and "old" API styles for compatibility.
+    """
+    # First try: current SDKs take `response_format`
     try:
-        resp = client.audio.speech.create(
-            model="gpt-4o-mini-tts",   # if this model is unavailable, you can try "tts-1"
-            voice="alloy",
+        resp = get_client().audio.speech.create(
+            model=TTS_MODEL,
+            voice=TTS_VOICE,
             input=text,
-            format="mp3",             # ⚠️ this is what raised TypeError earlier on some versions
+            response_format=audio_format,
         )
         audio_bytes = _extract_audio_bytes(resp)
         if audio_bytes:
             return audio_bytes
     except TypeError as e:
-        # This is the case we saw before: "got unexpected keyword argument 'format'"
-        print("TTS TypeError with format=mp3 style:", repr(e))
+        # Older SDKs: "got unexpected keyword argument 'response_format'"
+        print("TTS TypeError with response_format style:", repr(e))
     except Exception as e:
         # Any other error from this first attempt
         print("TTS error (first attempt):", repr(e))
 
-    # Second try: newer SDK style (no `format` argument, returns bytes directly)
+    # Second try: no format argument (API default is mp3)
+    if audio_format != "mp3":
+        return b""
     try:
-        resp2 = client.audio.speech.create(
-            model="gpt-4o-mini-tts",   # or "tts-1" if needed
-            voice="alloy",
+        resp2 = get_client().audio.speech.create(
+            model=TTS_MODEL,
+            voice=TTS_VOICE,
             input=text,
         )
         audio_bytes2 = _extract_audio_bytes(resp2)
@@ -124,3 +472,96 @@ def text_to_speech_bytes(text: str) -> Optional[bytes]:
 
     # If we reach here, TTS failed
     return b""
+
+
+def text_to_speech_bytes(text: str, audio_format: str = "mp3") -> Optional[bytes]:
+    """
+    Convert text into audio (MP3 by default) using OpenAI TTS in one request.
+    """
+    text = (text or "").strip()
+    if not text:
+        return b""
+
+    return _synthesize(text, audio_format)
+
+
+# =========================================================
+# 🔉 STREAMING TTS (sentence pipeline)
+# =========================================================
+
+class TTSError(RuntimeError):
+    """A segment of a streamed reply could not be synthesized."""
+
+
+# Sentence ends: . ! ? and the Devanagari danda, followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+")
+
+
+def split_into_segments(text: str, max_chars: int = 280, min_chars: int = 40) -> List[str]:
+    """
+    Split a reply into sentence-sized segments for TTS.
+
+    Very short sentences are merged with the next one (fewer requests),
+    and sentences longer than max_chars are cut at the last comma/space.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+
+    pieces = []
+    for line in text.splitlines():
+        for sentence in _SENTENCE_END.split(line.strip()):
+            sentence = sentence.strip()
+            while len(sentence) > max_chars:
+                cut = max(sentence.rfind(",", 0, max_chars), sentence.rfind(" ", 0, max_chars))
+                cut = cut + 1 if cut > 0 else max_chars
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+
+    segments = []
+    for piece in pieces:
+        if segments and len(segments[-1]) < min_chars and len(segments[-1]) + len(piece) < max_chars:
+            segments[-1] = f"{segments[-1]} {piece}"
+        else:
+            segments.append(piece)
+    return segments
+
+
+def text_to_speech_stream(
+    text: str,
+    audio_format: str = "mp3",
+    max_workers: int = 3,
+) -> Iterator[bytes]:
+    """
+    Yield audio for `text` segment by segment, in order.
+
+    Segments are synthesized concurrently (at most `max_workers` requests in
+    flight), so the first chunk is ready after roughly one sentence worth of
+    TTS latency and later chunks are usually ready by the time they are
+    needed. Raises TTSError when a segment fails to synthesize, instead of
+    leaving a silent gap in the reply.
+    MP3 chunks can be concatenated as-is; Ogg/Opus chunks form a chained stream.
+    """
+    segments = split_into_segments(text)
+    if not segments:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        next_idx = 0
+
+        # Keep the pipeline full, but never more than max_workers ahead
+        while next_idx < len(segments) and len(pending) < max_workers:
+            pending.append(pool.submit(in_context(_synthesize), segments[next_idx], audio_format))
+            next_idx += 1
+
+        while pending:
+            audio = pending.popleft().result()
+            if not audio:
+                raise TTSError(f"speech synthesis failed for segment {next_idx - len(pending)} of {len(segments)}")
+            if next_idx < len(segments):
+                pending.append(pool.submit(in_context(_synthesize), segments[next_idx], audio_format))
+                next_idx += 1
+            yield audio
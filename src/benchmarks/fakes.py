@@ -0,0 +1,152 @@
+# src/benchmarks/fakes.py
+
+"""
+Deterministic offline stand-ins for the OpenAI chat, embedding, speech-to-text
+and text-to-speech clients.
+
+They return the same output for the same input, never touch the network,
+and can simulate a fixed model latency, so benchmark runs are comparable
+with each other.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import time
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from agent.rule_parser import PARAM_KEYS
+
+FAKE_ANSWER = (
+    "Rice and jute fit your field best: the high rainfall and humidity suit both. "
+    "Keep the field well levelled, split the nitrogen dose, and drain water before harvest. "
+    "If you can, get a soil test to confirm potassium levels."
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers extraction prompts with an all-null JSON object and every other
+    prompt with FAKE_ANSWER. Streaming yields the reply word by word.
+    """
+
+    latency_s: float = 0.0        # simulated time before the first token
+    token_delay_s: float = 0.0    # simulated time per streamed token
+
+    @property
+    def _llm_type(self) -> str:
+        return "agrosense-fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content if messages else ""
+        if "RETURN JSON WITH EXACT KEYS" in prompt:
+            return json.dumps({key: None for key in PARAM_KEYS})
+        return FAKE_ANSWER
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(self.latency_s + self.token_delay_s * len(text.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_s)
+        words = self._reply(messages).split(" ")
+        for i, word in enumerate(words):
+            if self.token_delay_s:
+                time.sleep(self.token_delay_s)
+            token = word if i == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class FakeEmbeddings(Embeddings):
+    """Unit vectors seeded from the sha256 of the text."""
+
+    def __init__(self, size: int = 256, latency_s: float = 0.0):
+        self.size = size
+        self.latency_s = latency_s
+        self.model = f"fake-embedding-{size}"
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(self.size)
+        return (vec / np.linalg.norm(vec)).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency_s)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency_s)
+        return self._vector(text)
+
+
+FAKE_TRANSCRIPT = "mere khet me N 80 P 40 K 40 ph 6.5 temp 28 humidity 80 rainfall 200 hai"
+
+
+def fake_speech_to_text(audio_bytes: bytes, preprocess: bool = True) -> str:
+    """Same signature as audio_utils.speech_to_text_from_bytes."""
+    return FAKE_TRANSCRIPT if audio_bytes else ""
+
+
+def fake_text_to_speech_stream(text: str, audio_format: str = "mp3", max_workers: int = 3) -> Iterator[bytes]:
+    """Same signature as audio_utils.text_to_speech_stream: one chunk per sentence."""
+    for sentence in text.split(". "):
+        if sentence.strip():
+            yield hashlib.sha256(sentence.encode("utf-8")).digest() * 8
+
+
+def install_fakes(chat_latency_s: float = 0.0, token_delay_s: float = 0.0, embedding_latency_s: float = 0.0):
+    """Route every client from llm_clients.registry to the fakes above."""
+    from llm_clients import registry
+
+    registry.override(
+        chat_factory=lambda **_: FakeChatModel(latency_s=chat_latency_s, token_delay_s=token_delay_s),
+        embeddings_factory=lambda **_: FakeEmbeddings(latency_s=embedding_latency_s),
+    )
+
+
+def prepare_environment(work_dir: str):
+    """
+    Fake clients, a temp RAG index built from data/docs in `work_dir` and
+    in-memory caches, so nothing under data/ is read by the retriever or
+    written. (The shipped index holds real 1536-dim OpenAI vectors, which
+    FakeEmbeddings cannot query.)
+    """
+    from rag import embedding_cache, index_store
+
+    install_fakes()
+    os.environ["AGROSENSE_ANSWER_CACHE"] = "0"
+
+    index_store.DATA_DIR = work_dir
+    index_store.LEGACY_DB_DIR = os.path.join(work_dir, "chroma_db")
+    index_store.POINTER_PATH = os.path.join(work_dir, "chroma_index.json")
+    embedding_cache._default_cache = embedding_cache.EmbeddingCache(path=None)
+
+    from rag.build_index import build_chroma_index
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_chroma_index(full=True)
@@ -0,0 +1,180 @@
+# src/benchmarks/import_time.py
+
+"""
+Per-module import-time report.
+
+Imports each module in a fresh interpreter with `python -X importtime`
+and summarizes where the cold-start time goes: total, the slowest
+modules (cumulative and self time) and which heavy dependencies got
+loaded. Those should only be imported on first use (building the graph,
+the first STT/TTS call, the first Chroma query, ...), so a module listed
+there is a startup regression.
+
+Run from src/:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time agent.graph --top 30
+    python -m benchmarks.import_time --output imports.json
+    python -m benchmarks.import_time --compare imports.json --budget-ms 500
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_MODULES = ["agent.graph", "audio_utils", "llm_clients", "tracing"]
+
+# Packages that should be deferred until first use
+HEAVY_MODULES = (
+    "openai",
+    "httpx",
+    "langgraph.graph",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_community",
+    "chromadb",
+    "pandas",
+)
+
+# A module counts as a regression when it imports this much slower than the baseline
+REGRESSION_THRESHOLD = 0.25
+# ... and by at least this many milliseconds
+REGRESSION_MIN_MS = 20.0
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> list:
+    """Rows of `-X importtime` output as dicts {module, self_ms, cumulative_ms, depth}."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        rows.append({
+            "module": module,
+            "self_ms": int(self_us) / 1000.0,
+            "cumulative_ms": int(cumulative_us) / 1000.0,
+            "depth": max(0, (len(indent) - 1) // 2),
+        })
+    return rows
+
+
+def profile_import(module: str, top: int = 15) -> dict:
+    """Import `module` in a fresh interpreter and summarize its import time."""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+
+    rows = parse_importtime(proc.stderr)
+    # Rows are printed when a module finishes loading, so the tree of
+    # `module` ends at its own top-level row and starts after the previous
+    # one (everything before is interpreter startup: site, encodings, ...)
+    end = max(i for i, r in enumerate(rows) if r["depth"] == 0 and r["module"] == module)
+    start = max((i for i, r in enumerate(rows[:end]) if r["depth"] == 0), default=-1) + 1
+    rows = rows[start:end + 1]
+    loaded = {r["module"] for r in rows}
+    return {
+        "total_ms": rows[-1]["cumulative_ms"],
+        "modules": len(rows),
+        "heavy_loaded": [
+            name for name in HEAVY_MODULES
+            if name in loaded or any(m.startswith(name + ".") for m in loaded)
+        ],
+        "top_cumulative": [
+            {"module": r["module"], "ms": r["cumulative_ms"]}
+            for r in sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+        ],
+        "top_self": [
+            {"module": r["module"], "ms": r["self_ms"]}
+            for r in sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top]
+        ],
+    }
+
+
+def run(modules, top: int = 15) -> dict:
+    return {module: profile_import(module, top) for module in modules}
+
+
+def compare(current: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Print total import times next to a baseline report.
+    Returns the modules that got slower by more than `threshold`.
+    """
+    regressions = []
+    print(f"\n{'module':<28}{'baseline ms':>14}{'current ms':>14}{'change':>9}")
+    for module, report in current.items():
+        base = (baseline.get(module) or {}).get("total_ms")
+        if not base:
+            continue
+        value = report["total_ms"]
+        change = (value - base) / base
+        regressed = change > threshold and value - base >= REGRESSION_MIN_MS
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{module:<28}{base:>14.1f}{value:>14.1f}{change:>+9.0%}{flag}")
+        if regressed:
+            regressions.append(module)
+    return regressions
+
+
+def _print_report(results: dict, top: int):
+    for module, report in results.items():
+        print(f"\n[{module}]  {report['total_ms']:.1f} ms, {report['modules']} modules")
+        if report["heavy_loaded"]:
+            print(f"  heavy dependencies loaded: {', '.join(report['heavy_loaded'])}")
+        print("  slowest (cumulative):")
+        for row in report["top_cumulative"][:top]:
+            print(f"    {row['ms']:9.1f} ms  {row['module']}")
+        print("  slowest (self):")
+        for row in report["top_self"][:top]:
+            print(f"    {row['ms']:9.1f} ms  {row['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-module import times of AgroSense modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help=f"modules to import (default: {' '.join(DEFAULT_MODULES)})")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    parser.add_argument("--output", default=None, help="write the report to this JSON file")
+    parser.add_argument("--compare", default=None, help="baseline JSON file from an earlier run")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when any module imports slower than this")
+    args = parser.parse_args()
+
+    results = run(args.modules, top=args.top)
+    _print_report(results, args.top)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved report to {args.output}")
+
+    failed = False
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        if regressions:
+            print(f"\n{len(regressions)} module(s) import more than {REGRESSION_THRESHOLD:.0%} slower.")
+            failed = True
+
+    if args.budget_ms is not None:
+        over = [m for m, r in results.items() if r["total_ms"] > args.budget_ms]
+        if over:
+            print(f"\nOver the {args.budget_ms:.0f} ms budget: {', '.join(over)}")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
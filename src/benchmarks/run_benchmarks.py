@@ -0,0 +1,279 @@
+# src/benchmarks/run_benchmarks.py
+
+"""
+Offline micro-benchmarks for AgroSense.
+
+Uses the deterministic fake chat / embedding clients from benchmarks.fakes
+and a throwaway RAG index built from data/docs in a temp directory, so it
+needs no API key and never touches data/.
+
+Measures:
+  - startup: cold `import agent.graph` / `import audio_utils` in a fresh interpreter
+  - nodes: extract_params, crop_recommender, rag_retrieve, llm_answer
+  - end_to_end: graph.invoke, streamed time to first token, answer-cache hit
+  - recommender: single-query latency on synthetic catalogs and batch
+    throughput on synthetic samples (10k .. 1M)
+
+Run from src/:
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --quick --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import prepare_environment
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+FULL_QUERY = "N 80 P 40 K 40 ph 6.5 temp 28 humidity 80 rainfall 200"
+# Out-of-range value the rule parser leaves for the LLM fallback
+LLM_FALLBACK_QUERY = "nitrogen 500, baaki sab normal hai"
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+QUICK_SIZES = [10_000, 100_000]
+BATCH_CHUNK = 50_000
+
+# A metric counts as a regression when it is this much worse than the baseline
+REGRESSION_THRESHOLD = 0.20
+# ... and, for latencies, at least this many milliseconds (sub-ms timings are noisy)
+REGRESSION_MIN_MS = 0.5
+
+
+# ---------- helpers ----------
+
+def _stats(samples_s) -> dict:
+    ms = sorted(s * 1000.0 for s in samples_s)
+    return {
+        "n": len(ms),
+        "p50_ms": statistics.median(ms),
+        "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "mean_ms": statistics.fmean(ms),
+        "min_ms": ms[0],
+    }
+
+
+def time_calls(fn, iterations: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _stats(samples)
+
+
+# ---------- benchmarks ----------
+
+def bench_startup(repeats: int) -> dict:
+    """
+    Wall time of a fresh interpreter importing the agent graph and the
+    audio helpers (per-module breakdown: python -m benchmarks.import_time).
+    """
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    results = {}
+    for module in ("agent.graph", "audio_utils"):
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-c", f"import {module}"],
+                cwd=SRC_DIR, env=env, check=True, capture_output=True,
+            )
+            samples.append(time.perf_counter() - start)
+        results["import_" + module.replace(".", "_")] = _stats(samples)
+    return results
+
+
+def bench_nodes(iterations: int) -> dict:
+    from agent.graph import node_extract_params, node_llm_answer
+    from agent.schema import AgentState
+    from agent.tools import tool_crop_recommendation, tool_rag_retrieve
+
+    extract_state = AgentState(query=FULL_QUERY)
+    params = node_extract_params(extract_state)["extracted_params"]
+    scored = AgentState(query=FULL_QUERY, extracted_params=params)
+    crops = tool_crop_recommendation(scored)["crop_results"]
+    with_crops = AgentState(query=FULL_QUERY, extracted_params=params, crop_results=crops)
+    docs = tool_rag_retrieve(with_crops)["rag_results"]
+    answer_state = AgentState(query=FULL_QUERY, extracted_params=params, crop_results=crops, rag_results=docs)
+    search_only = AgentState(query="Which crop prefers flooded fields and high water availability?")
+
+    return {
+        "extract_params": time_calls(lambda: node_extract_params(extract_state), iterations),
+        "extract_params_llm": time_calls(
+            lambda: node_extract_params(AgentState(query=LLM_FALLBACK_QUERY)), iterations
+        ),
+        "crop_recommender": time_calls(lambda: tool_crop_recommendation(scored), iterations),
+        "rag_retrieve_topics": time_calls(lambda: tool_rag_retrieve(with_crops), iterations),
+        "rag_retrieve_search": time_calls(lambda: tool_rag_retrieve(search_only), iterations),
+        "llm_answer": time_calls(lambda: node_llm_answer(answer_state), iterations),
+    }
+
+
+def bench_end_to_end(iterations: int) -> dict:
+    from agent import answer_cache
+    from agent.graph import AnswerStream, graph
+
+    results = {"graph_invoke": time_calls(lambda: graph.invoke({"query": FULL_QUERY}), iterations)}
+
+    ttft = []
+    for _ in range(iterations):
+        stream = AnswerStream({"query": FULL_QUERY})
+        for _ in stream:
+            pass
+        ttft.append(stream.timings["time_to_first_token_s"])
+    results["stream_first_token"] = _stats(ttft)
+
+    os.environ["AGROSENSE_ANSWER_CACHE"] = "1"
+    answer_cache._default_cache = None
+    try:
+        results["graph_invoke_cache_hit"] = time_calls(
+            lambda: graph.invoke({"query": FULL_QUERY}), iterations
+        )
+    finally:
+        os.environ["AGROSENSE_ANSWER_CACHE"] = "0"
+        answer_cache._default_cache = None
+    return results
+
+
+def _synthetic(table, rows: int, seed: int) -> np.ndarray:
+    """Random rows within the value range of the real crop profiles."""
+    rng = np.random.default_rng(seed)
+    lo, hi = table.matrix.min(axis=0), table.matrix.max(axis=0)
+    return rng.uniform(lo, hi, size=(rows, table.matrix.shape[1])).astype(np.float32)
+
+
+def bench_recommender(sizes, iterations: int) -> dict:
+    from tools.crop_recommender import recommend_crops_batch, score_matrix, top_k_indices
+    from tools.profile_store import get_crop_profiles
+
+    table = get_crop_profiles()
+    query = _synthetic(table, 1, seed=1).astype(np.float64)
+
+    catalog = {}
+    for size in sizes:
+        profiles = _synthetic(table, size, seed=2)
+        stats = time_calls(lambda: top_k_indices(score_matrix(profiles, query), 5), iterations, warmup=1)
+        stats["crops_per_s"] = size / (stats["p50_ms"] / 1000.0)
+        catalog[str(size)] = stats
+
+    batch = {}
+    for size in sizes:
+        samples = _synthetic(table, size, seed=3).astype(np.float64)
+        start = time.perf_counter()
+        for offset in range(0, size, BATCH_CHUNK):
+            recommend_crops_batch(samples[offset:offset + BATCH_CHUNK], top_k=5)
+        elapsed = time.perf_counter() - start
+        batch[str(size)] = {"seconds": elapsed, "rows_per_s": size / elapsed}
+
+    return {"catalog_single_query": catalog, "batch_samples": batch}
+
+
+# ---------- reporting ----------
+
+def _flatten(data, prefix=""):
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, path + ".")
+        elif isinstance(value, (int, float)):
+            yield path, value
+
+
+def compare(current: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Print p50 latencies and throughputs next to a baseline run.
+    Returns the metrics that got worse by more than `threshold`.
+    """
+    base = dict(_flatten({k: v for k, v in baseline.items() if k != "meta"}))
+    regressions = []
+    print(f"\n{'metric':<58}{'baseline':>14}{'current':>14}{'change':>9}")
+    for path, value in _flatten({k: v for k, v in current.items() if k != "meta"}):
+        higher_is_better = path.endswith("_per_s")
+        if not (path.endswith("p50_ms") or higher_is_better) or path not in base or not base[path]:
+            continue
+        change = (value - base[path]) / base[path]
+        worse = -change if higher_is_better else change
+        regressed = worse > threshold and (higher_is_better or value - base[path] >= REGRESSION_MIN_MS)
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{path:<58}{base[path]:>14.6g}{value:>14.6g}{change:>+9.0%}{flag}")
+        if regressed:
+            regressions.append(path)
+    return regressions
+
+
+def _print_summary(results: dict):
+    for section in ("startup", "nodes", "end_to_end"):
+        print(f"\n[{section}]")
+        for name, stats in results[section].items():
+            print(f"  {name:<28} p50 {stats['p50_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms")
+    print("\n[recommender]")
+    for size, stats in results["recommender"]["catalog_single_query"].items():
+        print(f"  catalog {int(size):>9,} crops   p50 {stats['p50_ms']:9.3f} ms   {stats['crops_per_s']:,.0f} crops/s")
+    for size, stats in results["recommender"]["batch_samples"].items():
+        print(f"  batch   {int(size):>9,} rows    {stats['seconds']:9.3f} s    {stats['rows_per_s']:,.0f} rows/s")
+
+
+def run(quick: bool = False) -> dict:
+    iterations = 10 if quick else 50
+    sizes = QUICK_SIZES if quick else DEFAULT_SIZES
+
+    with tempfile.TemporaryDirectory(prefix="agrosense_bench_") as work_dir:
+        prepare_environment(work_dir)
+        results = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "quick": quick,
+            },
+            "startup": bench_startup(3 if quick else 5),
+            "nodes": bench_nodes(iterations),
+            "end_to_end": bench_end_to_end(iterations),
+            "recommender": bench_recommender(sizes, max(3, iterations // 10)),
+        }
+
+        from rag.retriever import close_vectordb
+
+        close_vectordb()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline AgroSense benchmark suite.")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, catalogs up to 100k")
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="baseline JSON file from an earlier run")
+    args = parser.parse_args()
+
+    results = run(quick=args.quick)
+    _print_summary(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {REGRESSION_THRESHOLD:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# src/llm_clients.py
+
+"""
+Process-wide registry of configured OpenAI clients.
+
+Graph nodes, the parameter extractor and the retriever ask this module for
+their chat / embedding clients instead of building new ones per call. All
+clients share one httpx connection pool (sync) and one async pool per
+event loop, so keep-alive connections and TLS sessions are reused across
+turns.
+
+Tunable through environment variables:
+    AGROSENSE_HTTP_MAX_CONNECTIONS   (default 20)
+    AGROSENSE_HTTP_MAX_KEEPALIVE     (default 10)
+    AGROSENSE_HTTP_KEEPALIVE_EXPIRY  seconds (default 60)
+    AGROSENSE_HTTP_TIMEOUT           seconds (default 60)
+    AGROSENSE_HTTP_CONNECT_TIMEOUT   seconds (default 5)
+    AGROSENSE_LLM_MAX_RETRIES        (default 2)
+
+Every chat client reports its calls (latency, token usage) to tracing.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+from dotenv import load_dotenv
+
+from tracing import callback_handler
+
+DEFAULT_CHAT_MODEL = "gpt-4o-mini"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _loop_local_async_client(limits: "httpx.Limits", timeout: "httpx.Timeout") -> "httpx.AsyncClient":
+    """
+    httpx.AsyncClient that sends every request through a pool of its own
+    event loop (created on first use there). An AsyncClient's connections
+    belong to the loop that opened them, but the model clients holding this
+    one are shared by the API server's loop, each asyncio.run() of the
+    Streamlit app, tests, ... Pools are weakly keyed by their loop, so a
+    finished loop's pool goes away with it.
+    """
+    import httpx
+
+    class LoopLocalAsyncClient(httpx.AsyncClient):
+        def __init__(self):
+            super().__init__(limits=limits, timeout=timeout)
+            self._pools = weakref.WeakKeyDictionary()
+            self._pools_lock = threading.Lock()
+
+        def _pool(self) -> httpx.AsyncClient:
+            loop = asyncio.get_running_loop()
+            with self._pools_lock:
+                pool = self._pools.get(loop)
+                if pool is None:
+                    pool = httpx.AsyncClient(limits=limits, timeout=timeout)
+                    self._pools[loop] = pool
+                return pool
+
+        async def send(self, request, **kwargs):
+            return await self._pool().send(request, **kwargs)
+
+        async def aclose(self):
+            # Only the current loop's pool can be closed from here; the
+            # others are dropped (their loops are usually gone already)
+            with self._pools_lock:
+                pool = self._pools.pop(asyncio.get_running_loop(), None)
+                self._pools.clear()
+            if pool is not None:
+                await pool.aclose()
+            await super().aclose()
+
+    return LoopLocalAsyncClient()
+
+
+class ClientRegistry:
+    """
+    Builds each distinct client configuration once and hands out the same
+    instance afterwards. Thread-safe, and the clients can be awaited from
+    any event loop (see _loop_local_async_client).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._env_loaded = False
+        self._http = None
+        self._async_http = None
+        self._chat = {}
+        self._embeddings = {}
+
+        # Optional factories replacing the OpenAI clients (offline benchmarks / demos)
+        self._chat_factory = None
+        self._embeddings_factory = None
+
+    # ---------- shared HTTP pools ----------
+
+    def _ensure_env(self):
+        if not self._env_loaded:
+            load_dotenv()
+            self._env_loaded = True
+
+    # httpx (and the OpenAI / LangChain clients below) are imported on first
+    # use, so importing this module stays cheap
+
+    def _limits(self) -> "httpx.Limits":
+        import httpx
+
+        return httpx.Limits(
+            max_connections=_env_int("AGROSENSE_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=_env_int("AGROSENSE_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=_env_float("AGROSENSE_HTTP_KEEPALIVE_EXPIRY", 60.0),
+        )
+
+    def _timeout(self) -> "httpx.Timeout":
+        import httpx
+
+        return httpx.Timeout(
+            _env_float("AGROSENSE_HTTP_TIMEOUT", 60.0),
+            connect=_env_float("AGROSENSE_HTTP_CONNECT_TIMEOUT", 5.0),
+        )
+
+    def http_client(self) -> "httpx.Client":
+        import httpx
+
+        with self._lock:
+            if self._http is None:
+                self._http = httpx.Client(limits=self._limits(), timeout=self._timeout())
+            return self._http
+
+    def async_http_client(self) -> "httpx.AsyncClient":
+        with self._lock:
+            if self._async_http is None:
+                self._async_http = _loop_local_async_client(self._limits(), self._timeout())
+            return self._async_http
+
+    # ---------- model clients ----------
+
+    def chat(self, model: str = DEFAULT_CHAT_MODEL, temperature: float = 0.0, **kwargs):
+        key = (model, temperature, tuple(sorted(kwargs.items())))
+        llm = self._chat.get(key)
+        if llm is not None:
+            return llm
+
+        with self._lock:
+            llm = self._chat.get(key)
+            if llm is None and self._chat_factory is not None:
+                llm = self._chat_factory(model=model, temperature=temperature, **kwargs)
+                llm.callbacks = [*(llm.callbacks or []), callback_handler()]
+                self._chat[key] = llm
+            if llm is None:
+                from langchain_openai import ChatOpenAI
+
+                self._ensure_env()
+                llm = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    max_retries=_env_int("AGROSENSE_LLM_MAX_RETRIES", 2),
+                    http_client=self.http_client(),
+                    http_async_client=self.async_http_client(),
+                    stream_usage=True,
+                    callbacks=[callback_handler()],
+                    **kwargs,
+                )
+                self._chat[key] = llm
+            return llm
+
+    def embeddings(self, model: str = DEFAULT_EMBEDDING_MODEL):
+        emb = self._embeddings.get(model)
+        if emb is not None:
+            return emb
+
+        with self._lock:
+            emb = self._embeddings.get(model)
+            if emb is None and self._embeddings_factory is not None:
+                emb = self._embeddings_factory(model=model)
+                self._embeddings[model] = emb
+            if emb is None:
+                from langchain_openai import OpenAIEmbeddings
+
+                self._ensure_env()
+                emb = OpenAIEmbeddings(
+                    model=model,
+                    max_retries=_env_int("AGROSENSE_LLM_MAX_RETRIES", 2),
+                    http_client=self.http_client(),
+                    http_async_client=self.async_http_client(),
+                )
+                self._embeddings[model] = emb
+            return emb
+
+    def override(self, chat_factory=None, embeddings_factory=None):
+        """
+        Build chat / embedding clients with these factories instead of OpenAI
+        (called with the same arguments as chat() / embeddings()).
+        Clients built so far are forgotten; override() with no arguments
+        restores the real clients.
+        """
+        with self._lock:
+            self._chat_factory = chat_factory
+            self._embeddings_factory = embeddings_factory
+            self._chat.clear()
+            self._embeddings.clear()
+
+    # ---------- lifecycle ----------
+
+    def close(self):
+        """Close the sync pool and forget all clients (they will be rebuilt on demand)."""
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+            self._http = None
+            self._chat.clear()
+            self._embeddings.clear()
+
+    async def aclose(self):
+        """Close both pools (the async one of the running loop) and forget all clients."""
+        async_http = self._async_http
+        self._async_http = None
+        self.close()
+        if async_http is not None:
+            await async_http.aclose()
+
+
+registry = ClientRegistry()
+
+
+def get_chat_model(model: str = DEFAULT_CHAT_MODEL, temperature: float = 0.0, **kwargs):
+    """Shared ChatOpenAI for this (model, temperature, options) combination."""
+    return registry.chat(model=model, temperature=temperature, **kwargs)
+
+
+def get_embeddings(model: str = DEFAULT_EMBEDDING_MODEL):
+    """Shared OpenAIEmbeddings for this model."""
+    return registry.embeddings(model=model)
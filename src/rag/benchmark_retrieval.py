@@ -0,0 +1,150 @@
+# src/rag/benchmark_retrieval.py
+
+"""
+Compare vector search latency: Chroma (sqlite + HNSW) vs. the exact
+memory-mapped matrix (rag.dense_index) in float32 / float16 / int8.
+
+Query vectors are stored chunk embeddings plus a little noise, so no
+embedding API calls are made and only the search itself is timed.
+
+    python -m rag.benchmark_retrieval                      # live index
+    python -m rag.benchmark_retrieval --synthetic 20000    # random corpus
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from rag import index_store
+from rag.build_index import COLLECTION_NAME
+from rag.dense_index import DENSE_DTYPES, DenseIndex, export_collection
+
+
+def _timed(fn, queries, repeat):
+    latencies = []
+    results = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            results.append(fn(q))
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies, results[: len(queries)]
+
+
+def _summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "mean_ms": statistics.fmean(ordered),
+    }
+
+
+def _recall(results, reference):
+    hits = total = 0
+    for got, want in zip(results, reference):
+        hits += len(set(got) & set(want))
+        total += len(want)
+    return hits / total if total else 1.0
+
+
+def _synthetic_collection(client, rows, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+    topics = [f"topic_{i}" for i in range(24)]
+    for start in range(0, rows, 1000):
+        n = min(1000, rows - start)
+        vectors = rng.standard_normal((n, dim)).astype(np.float32)
+        # Unit length, like OpenAI embeddings
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"doc_{start + i}.txt::0" for i in range(n)]
+        collection.add(
+            ids=ids,
+            embeddings=vectors,
+            documents=[f"synthetic chunk {start + i}" for i in range(n)],
+            metadatas=[
+                {"source": i.split("::")[0], "topic": topics[(start + j) % len(topics)], "chunk_id": i}
+                for j, i in enumerate(ids)
+            ],
+        )
+    return collection
+
+
+def run_benchmark(db_dir=None, synthetic=0, dim=1536, queries=50, k=5, repeat=3):
+    work_dir = tempfile.mkdtemp(prefix="agrosense_bench_")
+    if synthetic:
+        client = chromadb.PersistentClient(path=os.path.join(work_dir, "chroma"))
+        collection = _synthetic_collection(client, synthetic, dim)
+    else:
+        db_dir = db_dir or index_store.active_db_dir()
+        client = chromadb.PersistentClient(path=db_dir)
+        collection = client.get_collection(COLLECTION_NAME)
+
+    try:
+        data = collection.get(include=["embeddings"])
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        print(f"Corpus: {len(vectors)} vectors x {vectors.shape[1]} dims")
+
+        rng = np.random.default_rng(1)
+        picks = rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)
+        noise = rng.standard_normal((len(picks), vectors.shape[1])).astype(np.float32)
+        query_vectors = vectors[picks] + 0.1 * noise * np.abs(vectors[picks]).mean()
+
+        report = {}
+        latencies, chroma_results = _timed(
+            lambda q: collection.query(query_embeddings=[q.tolist()], n_results=k)["ids"][0],
+            query_vectors,
+            repeat,
+        )
+        report["chroma"] = _summary(latencies)
+
+        exact_reference = None
+        for dtype in DENSE_DTYPES:
+            dtype_dir = os.path.join(work_dir, dtype)
+            os.makedirs(dtype_dir, exist_ok=True)
+            export_collection(collection, dtype_dir, dtype=dtype)
+            dense = DenseIndex.load(dtype_dir)
+
+            latencies, results = _timed(
+                lambda q: [c["chunk_id"] for c in dense.search_by_vector(q, k=k)],
+                query_vectors,
+                repeat,
+            )
+            report[f"exact_{dtype}"] = _summary(latencies)
+            report[f"exact_{dtype}"]["matrix_mb"] = dense.nbytes / 1e6
+            if exact_reference is None:
+                exact_reference = results
+            report[f"exact_{dtype}"]["recall_vs_float32"] = _recall(results, exact_reference)
+
+        # HNSW is approximate; on unit vectors L2 and cosine rank the same
+        report["chroma"]["recall_vs_float32"] = _recall(chroma_results, exact_reference)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nTop-{k} search latency over {len(query_vectors)} queries x {repeat} runs:")
+    print(f"{'backend':<16}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'recall':>9}{'MB':>9}")
+    for name, row in report.items():
+        mb = f"{row['matrix_mb']:.1f}" if "matrix_mb" in row else "-"
+        print(
+            f"{name:<16}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['mean_ms']:>10.3f}"
+            f"{row['recall_vs_float32']:>9.2f}{mb:>9}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Chroma vs exact vector search.")
+    parser.add_argument("--db-dir", default=None, help="index directory (default: live index)")
+    parser.add_argument("--synthetic", type=int, default=0, help="use a random corpus of this many vectors")
+    parser.add_argument("--dim", type=int, default=1536, help="dimensions of the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.db_dir, args.synthetic, args.dim, args.queries, args.k, args.repeat)
@@ -0,0 +1,186 @@
+# src/rag/bm25.py
+
+"""
+In-memory BM25 inverted index over the same chunks as the Chroma collection.
+
+Built by build_index.py next to the vector store and saved as gzipped JSON
+(postings are delta-encoded document numbers + term frequencies), so it
+loads in milliseconds and answers keyword queries ("rice", "potassium
+deficiency") without an embedding call.
+"""
+
+import gzip
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.doc_store import chunk_ref
+
+BM25_FILE = "bm25.json.gz"
+FORMAT_VERSION = 1
+
+_WORD_RE = re.compile(r"[a-z0-9\u0900-\u0963\u0971-\u097f]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or",
+    "should", "so", "that", "the", "this", "to", "what", "when", "where",
+    "which", "who", "why", "will", "with", "you", "your",
+}
+
+
+def _stem(word: str) -> str:
+    """Light plural folding ("deficiencies" -> "deficiency", "fertilizers" -> "fertilizer")."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    words = _WORD_RE.findall((text or "").casefold())
+    return [_stem(w) for w in words if w not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of chunks.
+
+    Chunks are tokenized once at build time; only their references
+    (chunk_id, source, topic) are kept, so lexical hits come back in the
+    same shape as the vector retriever's results.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks: List[Dict] = []          # {chunk_id, source, topic}
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: Dict[str, float] = {}
+        self._norm = np.zeros(0, dtype=np.float32)
+        self._topics = np.zeros(0, dtype=object)
+
+    # ---------- building ----------
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        index = cls(k1=k1, b=b)
+        index.chunks = [chunk_ref(c) for c in chunks]
+
+        lengths = []
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for doc_no, chunk in enumerate(chunks):
+            terms = tokenize(chunk["content"])
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(doc_no)
+                tfs.append(tf)
+
+        index.lengths = np.asarray(lengths, dtype=np.float32)
+        index.postings = {
+            term: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (docs, tfs) in postings.items()
+        }
+        index._prepare()
+        return index
+
+    def _prepare(self):
+        n = len(self.chunks)
+        self._topics = np.array([c.get("topic") for c in self.chunks], dtype=object)
+        avgdl = float(self.lengths.mean()) if n else 0.0
+        self._idf = {
+            term: math.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, (docs, _) in self.postings.items()
+        }
+        # Per-document part of the BM25 denominator, computed once
+        if avgdl > 0:
+            self._norm = self.k1 * (1.0 - self.b + self.b * self.lengths / avgdl)
+        else:
+            self._norm = np.full(n, self.k1, dtype=np.float32)
+
+    # ---------- querying ----------
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def known_terms(self, query: str) -> Tuple[List[str], List[str]]:
+        """Split the query's terms into (in vocabulary, unknown)."""
+        known, unknown = [], []
+        for term in tokenize(query):
+            (known if term in self.postings else unknown).append(term)
+        return known, unknown
+
+    def search(self, query: str, k: int = 5, topic_filter: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Top-k (chunk number, score) pairs; only chunks matching a query term are returned."""
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        matched = False
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            scores[docs] += self._idf[term] * tfs * (self.k1 + 1.0) / (tfs + self._norm[docs])
+            matched = True
+
+        if not matched:
+            return []
+        if topic_filter:
+            scores[self._topics != topic_filter] = 0.0
+
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+    def results(self, hits: List[Tuple[int, float]]) -> List[Dict]:
+        return [{**self.chunks[i], "score": score} for i, score in hits]
+
+    # ---------- persistence ----------
+
+    def to_dict(self) -> dict:
+        postings = {}
+        for term, (docs, tfs) in self.postings.items():
+            deltas = np.diff(docs, prepend=0).astype(int).tolist()
+            postings[term] = [deltas, tfs.astype(int).tolist()]
+        return {
+            "format": FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "chunks": self.chunks,
+            "lengths": self.lengths.astype(int).tolist(),
+            "postings": postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format: {data.get('format')}")
+        index = cls(k1=data["k1"], b=data["b"])
+        index.chunks = data["chunks"]
+        index.lengths = np.asarray(data["lengths"], dtype=np.float32)
+        index.postings = {
+            term: (np.cumsum(deltas, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (deltas, tfs) in data["postings"].items()
+        }
+        index._prepare()
+        return index
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -1,24 +1,49 @@
 # src/rag/build_index.py
 
+import argparse
+import hashlib
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-from langchain_openai import OpenAIEmbeddings
+import chromadb
 from langchain_core.documents import Document
-from langchain_community.vectorstores import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from llm_clients import DEFAULT_EMBEDDING_MODEL, get_embeddings
+from rag.embedding_cache import CachedEmbeddings
+from rag import index_store
+from rag.bm25 import BM25_FILE, BM25Index
+from rag.dense_index import DENSE_DTYPES, DENSE_META_FILE, dense_dtype, export_collection
+from rag.doc_store import DOC_BLOB_FILE, DOC_META_FILE, DOC_OFFSETS_FILE, write_doc_store
+from rag.topic_index import TOPIC_INDEX_FILE, TopicIndex
+from tracing import in_context
 
 
 # project root = two levels up from this file: ...\agro_sense_ai
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 DOCS_DIR = os.path.join(ROOT, "data", "docs")
-DB_DIR = os.path.join(ROOT, "data", "chroma_db")
+DB_DIR = index_store.LEGACY_DB_DIR
+COLLECTION_NAME = "agro_docs"
+
+# Lookup indexes and chunk texts stored next to the Chroma collection
+SIDE_INDEX_FILES = (BM25_FILE, DENSE_META_FILE, TOPIC_INDEX_FILE, DOC_BLOB_FILE, DOC_OFFSETS_FILE, DOC_META_FILE)
+
+# Embedding requests are sent in batches bounded by count and by characters
+BATCH_SIZE = 64
+BATCH_MAX_CHARS = 200_000
+EMBED_WORKERS = 4
 
+# Documents are indexed as overlapping chunks of about this many characters
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 50
 
 
 def load_text_docs():
     """Load all .txt files from data/docs into LangChain Document objects."""
     docs = []
-    for fname in os.listdir(DOCS_DIR):
+    for fname in sorted(os.listdir(DOCS_DIR)):
         if not fname.lower().endswith(".txt"):
             continue
 
@@ -39,7 +64,141 @@ def load_text_docs():
     return docs
 
 
-def build_chroma_index():
+def file_hash(doc: Document) -> str:
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def _splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
+
+def chunk_document(doc: Document) -> list[Document]:
+    """
+    Split one source document into chunks with stable IDs.
+    The ID is "<source>::<chunk number>", so re-chunking an unchanged file
+    yields the same IDs and a changed file overwrites / deletes its own.
+    """
+    chunks = []
+    for i, text in enumerate(_splitter().split_text(doc.page_content)):
+        metadata = dict(doc.metadata)
+        metadata["chunk"] = i
+        metadata["chunk_id"] = f"{doc.metadata['source']}::{i}"
+        chunks.append(Document(page_content=text, metadata=metadata))
+    return chunks
+
+
+def doc_ids(doc: Document) -> list[str]:
+    """Stable vector IDs for the chunks of one source document."""
+    return [c.metadata["chunk_id"] for c in chunk_document(doc)]
+
+
+def chunking_config() -> dict:
+    return {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+
+def _batches(items, max_items=BATCH_SIZE, max_chars=BATCH_MAX_CHARS):
+    """Split (id, text, metadata) items into batches bounded by count and size."""
+    batch, chars = [], 0
+    for item in items:
+        size = len(item[1])
+        if batch and (len(batch) >= max_items or chars + size > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(item)
+        chars += size
+    if batch:
+        yield batch
+
+
+def diff_sources(docs, manifest):
+    """
+    Compare docs on disk with the manifest of the live index.
+    Returns (to_embed docs, stale vector IDs, unchanged source names).
+    """
+    previous = (manifest or {}).get("files", {})
+    current = {d.metadata["source"]: d for d in docs}
+
+    to_embed = []
+    stale_ids = []
+    unchanged = []
+    for source, doc in current.items():
+        entry = previous.get(source)
+        if entry and entry["sha256"] == file_hash(doc):
+            unchanged.append(source)
+            continue
+        to_embed.append(doc)
+        if entry:
+            stale_ids.extend(entry["ids"])
+
+    for source, entry in previous.items():
+        if source not in current:
+            stale_ids.extend(entry["ids"])
+
+    return to_embed, stale_ids, unchanged
+
+
+def embed_and_upsert(collection, embeddings, docs, workers=EMBED_WORKERS):
+    """Chunk docs, embed the chunks in bounded batches on a thread pool and upsert them in order."""
+    items = []
+    for doc in docs:
+        for chunk in chunk_document(doc):
+            items.append((chunk.metadata["chunk_id"], chunk.page_content, chunk.metadata))
+
+    batches = list(_batches(items))
+    if not batches:
+        return 0
+
+    def embed(batch):
+        return embeddings.embed_documents([t for _, t, _ in batch])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # in_context keeps the workers' embedding spans in the caller's trace
+        futures = [pool.submit(in_context(embed), batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            batch_vectors = future.result()
+            collection.upsert(
+                ids=[i for i, _, _ in batch],
+                documents=[t for _, t, _ in batch],
+                metadatas=[m for _, _, m in batch],
+                embeddings=batch_vectors,
+            )
+    return len(items)
+
+
+def chunk_records(docs) -> list[dict]:
+    """All chunks as plain dicts (chunk reference + content), in document order."""
+    records = []
+    for doc in docs:
+        for chunk in chunk_document(doc):
+            records.append(
+                {
+                    "content": chunk.page_content,
+                    "source": chunk.metadata["source"],
+                    "topic": chunk.metadata["topic"],
+                    "chunk_id": chunk.metadata["chunk_id"],
+                }
+            )
+    return records
+
+
+def build_chroma_index(full: bool = False, workers: int = EMBED_WORKERS, dense: str | None = None):
+    """
+    Build or incrementally update the RAG index.
+
+    Only added / changed files are embedded and vectors of removed files are
+    deleted. The update happens in a fresh versioned directory which is then
+    published atomically; the live index is never modified in place.
+
+    Next to the Chroma collection the directory gets the chunk texts
+    (rag.doc_store), a BM25 index, a topic index and the exported embedding
+    matrix for exact search, stored as `dense` ("float32", "float16" or
+    "int8"; default AGROSENSE_DENSE_DTYPE).
+    """
+    dense = dense or dense_dtype()
     print("Loading environment variables...")
     load_dotenv()
 
@@ -50,26 +209,90 @@ def build_chroma_index():
     if not docs:
         raise ValueError("No .txt files found in data/docs")
 
-    print("Creating embeddings object...")
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-    # Remove old DB if you want a fresh build each time
-    if os.path.exists(DB_DIR):
-        print(f"Removing existing DB directory at: {DB_DIR}")
-        import shutil
-        shutil.rmtree(DB_DIR)
-
-    print(f"Building Chroma DB at: {DB_DIR}")
-    vectordb = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        persist_directory=DB_DIR,
-        collection_name="agro_docs",
+    print("Creating embeddings object (cached, unchanged docs are not re-embedded)...")
+    embeddings = CachedEmbeddings(get_embeddings(DEFAULT_EMBEDDING_MODEL))
+
+    live_dir = index_store.active_db_dir()
+    manifest = index_store.load_manifest(live_dir)
+    if manifest and manifest.get("embedding_model") != DEFAULT_EMBEDDING_MODEL:
+        print("Embedding model changed, doing a full rebuild.")
+        manifest = None
+    if manifest and manifest.get("chunking") != chunking_config():
+        print("Chunking settings changed, doing a full rebuild.")
+        manifest = None
+    if full:
+        manifest = None
+
+    to_embed, stale_ids, unchanged = diff_sources(docs, manifest)
+    print(
+        f"Unchanged: {len(unchanged)}, to embed: {len(to_embed)}, "
+        f"stale vectors to delete: {len(stale_ids)}"
+    )
+    side_indexes_current = (
+        manifest is not None
+        and manifest.get("dense_dtype") == dense
+        and all(os.path.exists(os.path.join(live_dir, f)) for f in SIDE_INDEX_FILES)
+    )
+    if manifest is not None and not to_embed and not stale_ids and side_indexes_current:
+        print(f"Index v{manifest['version']} is up to date, nothing to do.")
+        return
+
+    version = index_store.next_version()
+    staging_dir = index_store.version_dir(version)
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+
+    if manifest is not None:
+        print(f"Incremental build: copying live index {live_dir} -> {staging_dir}")
+        shutil.copytree(live_dir, staging_dir)
+    else:
+        print(f"Full build into: {staging_dir}")
+
+    client = chromadb.PersistentClient(path=staging_dir)
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+    added = embed_and_upsert(collection, embeddings, to_embed, workers=workers)
+    print(f"Upserted {added} vectors, collection now has {collection.count()}.")
+    exported = export_collection(collection, staging_dir, dtype=dense)
+    print(f"Exported {exported} vectors ({dense}) for exact search.")
+
+    # Chunk texts, lexical and topic indexes are cheap to build, so they are always rebuilt from all chunks
+    records = chunk_records(docs)
+    write_doc_store(staging_dir, records)
+    print(f"Doc store: {len(records)} chunk texts.")
+    lexical = BM25Index.from_chunks(records)
+    lexical.save(os.path.join(staging_dir, BM25_FILE))
+    print(f"BM25 index: {len(lexical)} chunks, {len(lexical.postings)} terms.")
+    topics = TopicIndex.from_chunks(records)
+    topics.save(os.path.join(staging_dir, TOPIC_INDEX_FILE))
+    print(f"Topic index: {len(topics)} topics.")
+
+    index_store.save_manifest(
+        staging_dir,
+        {
+            "version": version,
+            "embedding_model": DEFAULT_EMBEDDING_MODEL,
+            "collection": COLLECTION_NAME,
+            "chunking": chunking_config(),
+            "dense_dtype": dense,
+            "files": {
+                d.metadata["source"]: {"sha256": file_hash(d), "ids": doc_ids(d)}
+                for d in docs
+            },
+        },
     )
 
-    vectordb.persist()
-    print("Chroma DB built and persisted successfully.")
+    index_store.publish(staging_dir, version)
+    index_store.cleanup_old_versions()
+    print(f"Published index v{version} at {staging_dir}")
+    print("Embedding cache:", embeddings.cache.stats())
 
 
 if __name__ == "__main__":
-    build_chroma_index()
+    parser = argparse.ArgumentParser(description="Build / update the AgroSense RAG index.")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild everything")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="parallel embedding requests")
+    parser.add_argument("--dense-dtype", choices=DENSE_DTYPES, default=None, help="storage type of the exact-search matrix")
+    args = parser.parse_args()
+    build_chroma_index(full=args.full, workers=args.workers, dense=args.dense_dtype)
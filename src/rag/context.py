@@ -0,0 +1,155 @@
+# src/rag/context.py
+
+"""
+Turn retrieved chunks into the "agronomy notes" block of the answer prompt.
+
+Chunks are taken in retrieval order (best first), de-duplicated (same
+chunk, or text already covered by an earlier overlapping chunk) and added
+until the token budget is used up; the last chunk that does not fit is cut
+at a sentence boundary if enough budget is left. The number of tokens used is reported back so it can be logged.
+
+Budget is configurable through AGROSENSE_CONTEXT_TOKENS (default 600).
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+from llm_clients import DEFAULT_CHAT_MODEL
+
+DEFAULT_TOKEN_BUDGET = 600
+
+# A truncated chunk smaller than this is not worth including
+MIN_PARTIAL_TOKENS = 40
+
+# Chunks whose word 3-grams are mostly covered already are dropped
+DUPLICATE_OVERLAP = 0.8
+
+_encoding = None
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+def token_budget() -> int:
+    try:
+        return int(os.getenv("AGROSENSE_CONTEXT_TOKENS", DEFAULT_TOKEN_BUDGET))
+    except ValueError:
+        return DEFAULT_TOKEN_BUDGET
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            try:
+                _encoding = tiktoken.encoding_for_model(DEFAULT_CHAT_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # No tokenizer available (or its files cannot be fetched):
+            # fall back to the ~4 characters per token rule of thumb
+            print("tiktoken unavailable, estimating tokens from length:", repr(e))
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    if enc:
+        return len(enc.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.casefold())
+    if len(words) < 3:
+        return {tuple(words)}
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of whole sentences that fits in max_tokens ("" if none)."""
+    kept = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        candidate = f"{kept} {sentence}".strip()
+        if count_tokens(candidate) > max_tokens:
+            break
+        kept = candidate
+    return kept
+
+
+def _format_chunk(result: Dict, text: str) -> str:
+    label = result.get("topic") or result.get("source") or "note"
+    return f"[{label}] {text.strip()}"
+
+
+def assemble_context(results: Optional[List[Dict]], budget: Optional[int] = None) -> Dict:
+    """
+    Build the notes block from retrieval results.
+
+    Args:
+        results: retriever output, best first. Chunks are taken in this
+                 order (scores are not compared: lookups by topic have
+                 none, and search scores are not on one scale).
+        budget: max tokens for the block (default: token_budget()).
+
+    Returns:
+        { "text": ..., "tokens": ..., "budget": ...,
+          "used": [chunk ids / sources], "dropped_duplicates": n, "dropped_budget": n }
+    """
+    budget = token_budget() if budget is None else budget
+
+    blocks: List[str] = []
+    used: List[str] = []
+    seen_ids = set()
+    seen_shingles: set = set()
+    tokens = 0
+    dropped_duplicates = 0
+    dropped_budget = 0
+
+    for result in results or []:
+        content = (result.get("content") or "").strip()
+        if not content:
+            continue
+
+        chunk_id = result.get("chunk_id") or result.get("source")
+        shingles = _shingles(content)
+        if chunk_id in seen_ids and result.get("chunk_id") is not None:
+            dropped_duplicates += 1
+            continue
+        if shingles and len(shingles & seen_shingles) / len(shingles) >= DUPLICATE_OVERLAP:
+            dropped_duplicates += 1
+            continue
+
+        block = _format_chunk(result, content)
+        # +1 for the newline joining blocks
+        cost = count_tokens(block) + (1 if blocks else 0)
+        if tokens + cost > budget:
+            remaining = budget - tokens - (1 if blocks else 0)
+            partial = ""
+            if remaining >= MIN_PARTIAL_TOKENS:
+                label_cost = count_tokens(_format_chunk(result, ""))
+                partial = _trim_to_tokens(content, remaining - label_cost)
+            if partial:
+                block = _format_chunk(result, partial)
+                cost = count_tokens(block) + (1 if blocks else 0)
+            if not partial or tokens + cost > budget:
+                dropped_budget += 1
+                continue
+
+        blocks.append(block)
+        used.append(chunk_id)
+        seen_ids.add(chunk_id)
+        seen_shingles |= shingles
+        tokens += cost
+
+    text = "\n".join(blocks)
+    return {
+        "text": text,
+        "tokens": count_tokens(text) if blocks else 0,
+        "budget": budget,
+        "used": used,
+        "dropped_duplicates": dropped_duplicates,
+        "dropped_budget": dropped_budget,
+    }
@@ -0,0 +1,207 @@
+# src/rag/dense_index.py
+
+"""
+Exact (brute-force) vector search over a memory-mapped embedding matrix.
+
+For a corpus of a few hundred chunks one matrix-vector product is cheaper
+than Chroma's sqlite + HNSW round trip. build_index.py exports the
+collection into the index directory as:
+
+    dense.npy          rows = L2-normalized chunk embeddings
+                       (float32, float16, or int8 with per-row scales)
+    dense_scales.npy   per-row scales (int8 only)
+    dense.json         sidecar: dtype, dim, and per-row chunk references
+                       (chunk_id, source, topic; texts are in rag.doc_store)
+
+The matrix is opened with mmap_mode="r", so only touched pages are loaded
+and several processes share the OS page cache. float16 halves memory but
+its conversion is slow on CPUs without native half-precision support;
+int8 cuts memory by 4x at almost no cost in speed or recall (see
+rag.benchmark_retrieval).
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from rag.doc_store import chunk_ref
+
+DENSE_MATRIX_FILE = "dense.npy"
+DENSE_SCALES_FILE = "dense_scales.npy"
+DENSE_META_FILE = "dense.json"
+FORMAT_VERSION = 1
+
+DENSE_DTYPES = ("float32", "float16", "int8")
+DEFAULT_DENSE_DTYPE = "float32"
+
+# Rows widened to float32 at a time when scoring float16 / int8 matrices
+SCORE_BLOCK_ROWS = 4096
+
+
+def dense_dtype() -> str:
+    dtype = os.getenv("AGROSENSE_DENSE_DTYPE", DEFAULT_DENSE_DTYPE).lower()
+    return dtype if dtype in DENSE_DTYPES else DEFAULT_DENSE_DTYPE
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _quantize(matrix: np.ndarray, dtype: str):
+    """Return (stored matrix, per-row scales or None)."""
+    if dtype == "float32":
+        return matrix.astype(np.float32), None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        stored = np.round(matrix / scales[:, None]).astype(np.int8)
+        return stored, scales.astype(np.float32)
+    raise ValueError(f"Unsupported dense dtype: {dtype!r} (expected one of {DENSE_DTYPES})")
+
+
+def write_dense_index(db_dir: str, embeddings, chunks: List[Dict], dtype: str = DEFAULT_DENSE_DTYPE):
+    """
+    Write the matrix + sidecar for `chunks` (dicts with source, topic,
+    chunk_id) whose vectors are `embeddings`, in the same order.
+    """
+    if chunks:
+        matrix = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(chunks), -1))
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    stored, scales = _quantize(matrix, dtype)
+
+    def _save_npy(name, array):
+        path = os.path.join(db_dir, name)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(f"{path}.tmp", path)
+
+    _save_npy(DENSE_MATRIX_FILE, stored)
+    if scales is not None:
+        _save_npy(DENSE_SCALES_FILE, scales)
+
+    meta_path = os.path.join(db_dir, DENSE_META_FILE)
+    with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "format": FORMAT_VERSION,
+                "dtype": dtype,
+                "dim": int(matrix.shape[1]),
+                "chunks": [chunk_ref(c) for c in chunks],
+            },
+            f,
+            ensure_ascii=False,
+        )
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def export_collection(collection, db_dir: str, dtype: str = DEFAULT_DENSE_DTYPE) -> int:
+    """Export every vector of a Chroma collection into `db_dir`. Returns the row count."""
+    data = collection.get(include=["embeddings", "metadatas"])
+    rows = sorted(zip(data["ids"], data["embeddings"], data["metadatas"]), key=lambda row: row[0])
+
+    chunks = []
+    vectors = []
+    for vec_id, vector, metadata in rows:
+        metadata = metadata or {}
+        chunks.append(
+            {
+                "source": metadata.get("source"),
+                "topic": metadata.get("topic"),
+                "chunk_id": metadata.get("chunk_id") or vec_id,
+            }
+        )
+        vectors.append(vector)
+
+    write_dense_index(db_dir, vectors, chunks, dtype=dtype)
+    return len(chunks)
+
+
+class DenseIndex:
+    """
+    Exact cosine top-k over a memory-mapped matrix.
+
+    topic_filter is answered from precomputed per-topic row lists, so a
+    filtered query only multiplies the rows of that topic.
+    """
+
+    def __init__(self, matrix: np.ndarray, scales: Optional[np.ndarray], chunks: List[Dict], dtype: str):
+        self.matrix = matrix
+        self.scales = scales
+        self.chunks = chunks
+        self.dtype = dtype
+
+        topics: Dict[str, List[int]] = {}
+        for i, chunk in enumerate(chunks):
+            topics.setdefault(chunk.get("topic"), []).append(i)
+        self.topic_rows = {t: np.asarray(rows, dtype=np.int64) for t, rows in topics.items()}
+
+    @classmethod
+    def load(cls, db_dir: str) -> "DenseIndex":
+        with open(os.path.join(db_dir, DENSE_META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported dense index format: {meta.get('format')}")
+
+        matrix = np.load(os.path.join(db_dir, DENSE_MATRIX_FILE), mmap_mode="r")
+        scales = None
+        if meta["dtype"] == "int8":
+            scales = np.load(os.path.join(db_dir, DENSE_SCALES_FILE))
+        return cls(matrix, scales, meta["chunks"], meta["dtype"])
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def _scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        if matrix.dtype == np.float32:
+            return matrix @ query
+
+        # float16 / int8 rows are widened to float32 block by block: mixed-type
+        # products skip BLAS and are several times slower than the copy
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+    def search_by_vector(self, vector, k: int = 5, topic_filter: Optional[str] = None) -> List[Dict]:
+        """Top-k chunks by cosine similarity, best first, in retriever result format."""
+        rows = None
+        if topic_filter:
+            rows = self.topic_rows.get(topic_filter)
+            if rows is None:
+                return []
+        n = len(self.chunks) if rows is None else len(rows)
+        if n == 0 or k <= 0:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = np.asarray(self._scores(query, rows), dtype=np.float32)
+        if n > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top_scores = scores[top]
+
+        if rows is not None:
+            top = rows[top]
+        return [{**self.chunks[i], "score": float(s)} for i, s in zip(top, top_scores)]
@@ -0,0 +1,117 @@
+# src/rag/doc_store.py
+
+"""
+Read-only store of chunk texts, shared by all retrieval paths.
+
+Retrieval results are lightweight references ({chunk_id, source, topic,
+score}); the text of a chunk is read from this store only when the answer
+prompt is built (see retriever.resolve_documents). build_index.py writes
+it into the index directory as:
+
+    docs.bin          UTF-8 texts of all chunks, back to back
+    docs_offsets.npy  int64 byte offsets, one per chunk plus the end
+    docs.json         chunk ids in the same order
+
+docs.bin is memory-mapped, so the texts stay in the OS page cache (shared
+between processes) instead of in every index and every session state.
+"""
+
+import json
+import mmap
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+DOC_BLOB_FILE = "docs.bin"
+DOC_OFFSETS_FILE = "docs_offsets.npy"
+DOC_META_FILE = "docs.json"
+FORMAT_VERSION = 1
+
+# Fields of a chunk kept in indexes and retrieval results
+REF_FIELDS = ("chunk_id", "source", "topic")
+
+
+def chunk_ref(chunk: Dict, score: Optional[float] = None) -> Dict:
+    """Reference to a chunk (no text); `score` is added when given."""
+    ref = {field: chunk.get(field) for field in REF_FIELDS}
+    if score is not None:
+        ref["score"] = score
+    return ref
+
+
+def write_doc_store(db_dir: str, chunks: List[Dict]):
+    """Write the texts of `chunks` (dicts with chunk_id and content) into `db_dir`."""
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    blob_path = os.path.join(db_dir, DOC_BLOB_FILE)
+    with open(f"{blob_path}.tmp", "wb") as f:
+        for i, chunk in enumerate(chunks):
+            data = (chunk.get("content") or "").encode("utf-8")
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+    os.replace(f"{blob_path}.tmp", blob_path)
+
+    offsets_path = os.path.join(db_dir, DOC_OFFSETS_FILE)
+    with open(f"{offsets_path}.tmp", "wb") as f:
+        np.save(f, offsets)
+    os.replace(f"{offsets_path}.tmp", offsets_path)
+
+    meta_path = os.path.join(db_dir, DOC_META_FILE)
+    with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"format": FORMAT_VERSION, "chunk_ids": [c["chunk_id"] for c in chunks]}, f, ensure_ascii=False)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+class DocStore:
+    """chunk_id -> text over a memory-mapped blob."""
+
+    def __init__(self, blob, offsets: np.ndarray, chunk_ids: List[str]):
+        self._blob = blob
+        self._offsets = offsets
+        self._rows = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+
+    @classmethod
+    def load(cls, db_dir: str) -> "DocStore":
+        with open(os.path.join(db_dir, DOC_META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported doc store format: {meta.get('format')}")
+
+        offsets = np.load(os.path.join(db_dir, DOC_OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(db_dir, DOC_BLOB_FILE), "rb") as f:
+            # mmap of an empty file is not allowed
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+        return cls(blob, offsets, meta["chunk_ids"])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, chunk_id) -> bool:
+        return chunk_id in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._offsets[-1])
+
+    def get(self, chunk_id: str) -> Optional[str]:
+        row = self._rows.get(chunk_id)
+        if row is None:
+            return None
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return self._blob[start:end].decode("utf-8")
+
+    def resolve(self, refs: Iterable[Dict]) -> List[Dict]:
+        """
+        Copies of `refs` with their "content" filled in. Results that
+        already carry text (indexes built before the doc store) are kept
+        as they are; references the store does not know are dropped.
+        """
+        resolved = []
+        for ref in refs or []:
+            if ref.get("content"):
+                resolved.append(dict(ref))
+                continue
+            content = self.get(ref.get("chunk_id"))
+            if content is not None:
+                resolved.append({**ref, "content": content})
+        return resolved
@@ -0,0 +1,291 @@
+# src/rag/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tracing import span
+
+# project root = two levels up from this file
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CACHE_PATH = os.path.join(ROOT, "data", "embedding_cache.sqlite3")
+
+# Disk hits refresh last_used in batches: once this many are pending ...
+TOUCH_BATCH = 256
+# ... or the oldest pending one is this old (seconds), and before evicting
+TOUCH_MAX_AGE = 30.0
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and case so near-identical questions share a key."""
+    return " ".join((text or "").split()).casefold()
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache: in-memory LRU in front of a sqlite file.
+
+    Keys are sha256(model + text). Vectors are kept as float32 arrays in
+    memory and float32 blobs on disk. Both levels are size bounded; the
+    disk level evicts least recently used rows once it grows past
+    `disk_items`. last_used of disk hits is written in batches, so a
+    lookup does not cost a commit.
+    """
+
+    def __init__(self, path: Optional[str] = CACHE_PATH, memory_items: int = 4096, disk_items: int = 200_000):
+        self.path = path
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = None
+        self._disk_count = 0
+        self._touched = {}  # key -> last_used not yet written
+        self._touched_since = 0.0
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    # ---------- keys / storage helpers ----------
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _db(self):
+        if self.path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+            self._disk_count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # ---------- public API ----------
+
+    def _touch(self, keys, now: float):
+        if not self._touched:
+            self._touched_since = now
+        for key in keys:
+            self._touched[key] = now
+        if len(self._touched) >= TOUCH_BATCH or now - self._touched_since >= TOUCH_MAX_AGE:
+            self._flush_touched()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        """Write the pending last_used updates (the caller commits)."""
+        if self._touched and self._conn is not None:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(t, key) for key, t in self._touched.items()],
+            )
+        self._touched.clear()
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        out = [None] * len(keys)
+        missing = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    out[i] = vec
+                else:
+                    missing.append(i)
+
+            conn = self._db()
+            if missing and conn is not None:
+                wanted = list({keys[i] for i in missing})
+                found = {}
+                for start in range(0, len(wanted), 500):
+                    part = wanted[start:start + 500]
+                    marks = ",".join("?" * len(part))
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+
+                if found:
+                    self._touch(found, time.time())
+
+                still_missing = []
+                for i in missing:
+                    vec = found.get(keys[i])
+                    if vec is None:
+                        still_missing.append(i)
+                        continue
+                    self.hits_disk += 1
+                    self._remember(keys[i], vec)
+                    out[i] = vec
+                missing = still_missing
+
+            self.misses += len(missing)
+
+        return out
+
+    def put_many(self, model: str, keys: List[str], vectors: List[List[float]]):
+        vectors = [np.asarray(vec, dtype=np.float32) for vec in vectors]
+        with self._lock:
+            for key, vec in zip(keys, vectors):
+                self._remember(key, vec)
+
+            conn = self._db()
+            if conn is None:
+                return
+
+            now = time.time()
+            rows = [(key, model, vec.tobytes(), now) for key, vec in zip(keys, vectors)]
+            cur = conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._disk_count += max(cur.rowcount, 0)
+
+            self._flush_touched()
+            if self._disk_count > self.disk_items:
+                # Evict down to 90% so we don't pay this on every insert
+                excess = self._disk_count - int(self.disk_items * 0.9)
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+                self._disk_count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": self._disk_count,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush_touched()
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that consults an EmbeddingCache before calling the
+    underlying client. Queries are keyed on their normalized text,
+    documents on their exact text, both together with the model name.
+    """
+
+    def __init__(self, inner: Embeddings, cache: Optional[EmbeddingCache] = None, model: Optional[str] = None):
+        self.inner = inner
+        self.cache = cache or get_embedding_cache()
+        self.model = model or getattr(inner, "model", None) or type(inner).__name__
+
+    def _keys(self, texts, normalize):
+        if normalize:
+            texts = [normalize_query(t) for t in texts]
+        return [EmbeddingCache.make_key(self.model, t) for t in texts]
+
+    def _split(self, texts, normalize):
+        """Return (keys, cached vectors, indices of the first text for each missing key)."""
+        keys = self._keys(texts, normalize)
+        cached = self.cache.get_many(keys)
+        seen = set()
+        miss_idx = []
+        for i, vec in enumerate(cached):
+            if vec is None and keys[i] not in seen:
+                seen.add(keys[i])
+                miss_idx.append(i)
+        return keys, cached, miss_idx
+
+    def _merge(self, keys, cached, miss_idx, fresh):
+        """Cached and fresh vectors in input order, as the lists the Embeddings interface returns."""
+        by_key = {}
+        if miss_idx:
+            self.cache.put_many(self.model, [keys[i] for i in miss_idx], fresh)
+            by_key = {keys[i]: list(vec) for i, vec in zip(miss_idx, fresh)}
+        return [vec.tolist() if vec is not None else by_key[key] for key, vec in zip(keys, cached)]
+
+    @staticmethod
+    def _trace_attrs(texts, cached, miss_idx) -> dict:
+        return {
+            "texts": len(texts),
+            "cache_hits": sum(vec is not None for vec in cached),
+            "cache_misses": len(miss_idx),
+            "bytes_in": sum(len(texts[i].encode("utf-8")) for i in miss_idx),
+        }
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embeddings", "embed_documents", model=self.model) as s:
+            keys, cached, miss_idx = self._split(texts, normalize=False)
+            s.set(**self._trace_attrs(texts, cached, miss_idx))
+            fresh = self.inner.embed_documents([texts[i] for i in miss_idx]) if miss_idx else []
+            return self._merge(keys, cached, miss_idx, fresh)
+
+    def embed_query(self, text: str) -> List[float]:
+        with span("embeddings", "embed_query", model=self.model) as s:
+            keys, cached, miss_idx = self._split([text], normalize=True)
+            s.set(**self._trace_attrs([text], cached, miss_idx))
+            fresh = [self.inner.embed_query(text)] if miss_idx else []
+            return self._merge(keys, cached, miss_idx, fresh)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embeddings", "embed_documents", model=self.model) as s:
+            keys, cached, miss_idx = self._split(texts, normalize=False)
+            s.set(**self._trace_attrs(texts, cached, miss_idx))
+            fresh = await self.inner.aembed_documents([texts[i] for i in miss_idx]) if miss_idx else []
+            return self._merge(keys, cached, miss_idx, fresh)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with span("embeddings", "embed_query", model=self.model) as s:
+            keys, cached, miss_idx = self._split([text], normalize=True)
+            s.set(**self._trace_attrs([text], cached, miss_idx))
+            fresh = [await self.inner.aembed_query(text)] if miss_idx else []
+            return self._merge(keys, cached, miss_idx, fresh)[0]
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide embedding cache backed by data/embedding_cache.sqlite3."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = EmbeddingCache()
+    return _default_cache
@@ -0,0 +1,136 @@
+# src/rag/index_store.py
+
+"""
+Where the live RAG index is, and what is in it.
+
+Each build writes a complete index into its own directory
+(data/chroma_db.v<N>) together with a manifest.json describing the
+source files it was built from. The live index is selected by a small
+pointer file (data/chroma_index.json) that is replaced atomically, so a
+running app never sees a half-built store. Without a pointer file the
+original data/chroma_db directory is used.
+"""
+
+import json
+import os
+import re
+import shutil
+
+# project root = two levels up from this file
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_DIR = os.path.join(ROOT, "data")
+LEGACY_DB_DIR = os.path.join(DATA_DIR, "chroma_db")
+POINTER_PATH = os.path.join(DATA_DIR, "chroma_index.json")
+MANIFEST_NAME = "manifest.json"
+
+_VERSION_DIR = re.compile(r"^chroma_db\.v(\d+)$")
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_json_atomic(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_pointer() -> dict | None:
+    return _read_json(POINTER_PATH)
+
+
+_pointer_cache = {}  # pointer path -> (stat signature, pointer)
+
+
+def live_pointer() -> dict | None:
+    """
+    read_pointer() for the query path: the file is only re-read when its
+    stat signature changes (publish() replaces it), so asking for the live
+    index on every lookup costs one os.stat().
+    """
+    path = POINTER_PATH
+    try:
+        st = os.stat(path)
+        sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        sig = None
+
+    cached = _pointer_cache.get(path)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+
+    pointer = _read_json(path) if sig is not None else None
+    _pointer_cache[path] = (sig, pointer)
+    return pointer
+
+
+def active_db_dir() -> str:
+    """Directory of the index the app should read right now."""
+    pointer = live_pointer()
+    if pointer and pointer.get("db_dir"):
+        return os.path.join(DATA_DIR, pointer["db_dir"])
+    return LEGACY_DB_DIR
+
+
+def index_version() -> str:
+    """Short identifier of the live index (changes on every publish)."""
+    pointer = live_pointer()
+    if pointer and pointer.get("version") is not None:
+        return f"v{pointer['version']}"
+    return "legacy"
+
+
+def _version_dirs():
+    versions = []
+    for name in os.listdir(DATA_DIR):
+        m = _VERSION_DIR.match(name)
+        if m:
+            versions.append((int(m.group(1)), os.path.join(DATA_DIR, name)))
+    return sorted(versions)
+
+
+def next_version() -> int:
+    """A version number no existing index directory or pointer uses."""
+    pointer = read_pointer() or {}
+    used = [v for v, _ in _version_dirs()] + [pointer.get("version") or 0]
+    return max(used) + 1
+
+
+def version_dir(version: int) -> str:
+    return os.path.join(DATA_DIR, f"chroma_db.v{version}")
+
+
+def load_manifest(db_dir: str) -> dict | None:
+    return _read_json(os.path.join(db_dir, MANIFEST_NAME))
+
+
+def save_manifest(db_dir: str, manifest: dict):
+    _write_json_atomic(os.path.join(db_dir, MANIFEST_NAME), manifest)
+
+
+def publish(db_dir: str, version: int):
+    """Atomically make `db_dir` the live index."""
+    _write_json_atomic(
+        POINTER_PATH,
+        {"db_dir": os.path.basename(db_dir), "version": version},
+    )
+
+
+def cleanup_old_versions(keep: int = 2):
+    """
+    Remove all but the newest `keep` versioned index directories.
+    The previous version is kept by default so readers that still hold it
+    open can finish before they notice the new pointer.
+    """
+    active = os.path.abspath(active_db_dir())
+    for _, path in list(reversed(_version_dirs()))[keep:]:
+        if os.path.abspath(path) != active:
+            shutil.rmtree(path, ignore_errors=True)
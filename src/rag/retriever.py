@@ -1,35 +1,318 @@
 # src/rag/retriever.py
 
+import asyncio
 import os
-from dotenv import load_dotenv
+import threading
+import time
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from llm_clients import get_embeddings
+from rag.bm25 import BM25_FILE, BM25Index
+from rag.dense_index import DENSE_META_FILE, DenseIndex
+from rag.doc_store import DOC_META_FILE, DocStore, chunk_ref
+from rag.index_store import LEGACY_DB_DIR, active_db_dir
+from rag.topic_index import TOPIC_INDEX_FILE, TopicIndex
+from tracing import span
 
 # project root = .../agro_sense_ai
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-DB_DIR = os.path.join(ROOT, "data", "chroma_db")
+DB_DIR = LEGACY_DB_DIR  # used until a versioned index is published
 COLLECTION_NAME = "agro_docs"
 
+# "auto" answers keyword-style queries lexically and everything else hybrid
+RETRIEVAL_MODES = ("auto", "hybrid", "dense", "lexical")
+DEFAULT_RETRIEVAL_MODE = "auto"
 
-def _load_vectordb():
+# Reciprocal rank fusion constant and candidate pool per retriever
+RRF_K = 60
+FUSION_CANDIDATES = 20
+
+# Dense search backend: "chroma", "exact" (memory-mapped matrix, see
+# rag.dense_index) or "auto" (exact when the live index has a matrix)
+VECTOR_BACKENDS = ("auto", "chroma", "exact")
+DEFAULT_VECTOR_BACKEND = "auto"
+
+# Queries with at most this many content terms, all of them in the BM25
+# vocabulary, count as keyword queries in "auto" mode
+KEYWORD_MAX_TERMS = 3
+
+
+def _load_vectordb(db_dir: str | None = None):
     """
-    Internal helper to load the persisted Chroma DB.
-    Call this inside your tools / LangGraph nodes.
+    Internal helper to open the persisted Chroma DB (the live index by default).
+    Prefer get_vectordb(), which reuses one warm handle per process.
     """
-    load_dotenv()
+    # Chroma and the LangChain embeddings base class load on first use
+    from langchain_community.vectorstores import Chroma
+    from rag.embedding_cache import CachedEmbeddings
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    embeddings = CachedEmbeddings(get_embeddings())
 
     vectordb = Chroma(
         embedding_function=embeddings,
-        persist_directory=DB_DIR,
+        persist_directory=db_dir or active_db_dir(),
         collection_name=COLLECTION_NAME,
     )
     return vectordb
 
 
-def retrieve_agri_docs(query: str, k: int = 5, topic_filter: str | None = None):
+class _VectorStoreHandle:
+    """
+    Lazily opened, process-wide Chroma handle shared by all turns/sessions.
+
+    The first caller opens the store; later callers get the same object.
+    A cheap health check (collection count) runs at most every
+    HEALTH_CHECK_INTERVAL seconds and the store is reopened if it fails,
+    or if a newer index has been published (see rag.index_store).
+    """
+
+    HEALTH_CHECK_INTERVAL = 30.0
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._vectordb = None
+        self._db_dir = None
+        self._last_check = 0.0
+
+    def healthy(self) -> bool:
+        """True if a store is open and answers a trivial query."""
+        vectordb = self._vectordb
+        return vectordb is not None and self._healthy(vectordb)
+
+    def _healthy(self, vectordb) -> bool:
+        try:
+            vectordb._collection.count()
+            return True
+        except Exception as e:
+            print("Chroma health check failed, reopening:", repr(e))
+            return False
+
+    def get(self):
+        vectordb = self._vectordb
+        if vectordb is not None and time.monotonic() - self._last_check < self.HEALTH_CHECK_INTERVAL:
+            return vectordb
+
+        with self._lock:
+            vectordb = self._vectordb
+            live_dir = active_db_dir()
+            if vectordb is not None and live_dir != self._db_dir:
+                print("New RAG index published, switching to:", live_dir)
+                self._close_locked()
+                vectordb = None
+            if vectordb is not None and not self._healthy(vectordb):
+                self._close_locked()
+                vectordb = None
+
+            if vectordb is None:
+                vectordb = self._loader(live_dir)
+                self._vectordb = vectordb
+                self._db_dir = live_dir
+
+            self._last_check = time.monotonic()
+            return vectordb
+
+    def reopen(self):
+        """Drop the current handle and open a fresh one."""
+        with self._lock:
+            self._close_locked()
+        return self.get()
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self):
+        # Only drop this handle's reference. chromadb keeps one System per
+        # path, shared by every client opened on it in this process (an
+        # index build, a benchmark, ...), so stopping it or clearing the
+        # process-wide system cache here would break those other clients.
+        self._vectordb = None
+        self._last_check = 0.0
+
+
+_handle = _VectorStoreHandle(_load_vectordb)
+
+
+def get_vectordb():
+    """Return the shared, warm Chroma vector store."""
+    return _handle.get()
+
+
+def close_vectordb():
+    """Close the shared vector store (e.g. on shutdown or after re-indexing)."""
+    _handle.close()
+
+
+class _IndexFileHandle:
+    """
+    Process-wide, read-only side index (BM25, dense matrix) of the live RAG
+    index, loaded on first use and reloaded when a new index is published.
+    get() returns None for indexes built before that file existed.
+    """
+
+    def __init__(self, filename, loader, label):
+        self._filename = filename
+        self._loader = loader
+        self._label = label
+        self._lock = threading.Lock()
+        self._db_dir = None
+        self._index = None
+
+    def get(self):
+        live_dir = active_db_dir()
+        if live_dir == self._db_dir:
+            return self._index
+
+        with self._lock:
+            if live_dir != self._db_dir:
+                index = None
+                if os.path.exists(os.path.join(live_dir, self._filename)):
+                    try:
+                        index = self._loader(live_dir)
+                    except Exception as e:
+                        print(f"Could not load {self._label} index, skipping it:", repr(e))
+                self._index = index
+                self._db_dir = live_dir
+            return self._index
+
+
+_lexical = _IndexFileHandle(
+    BM25_FILE, lambda db_dir: BM25Index.load(os.path.join(db_dir, BM25_FILE)), "BM25"
+)
+_dense = _IndexFileHandle(DENSE_META_FILE, DenseIndex.load, "dense")
+_topics = _IndexFileHandle(
+    TOPIC_INDEX_FILE, lambda db_dir: TopicIndex.load(os.path.join(db_dir, TOPIC_INDEX_FILE)), "topic"
+)
+_docs = _IndexFileHandle(DOC_META_FILE, DocStore.load, "doc store")
+
+
+def get_lexical_index() -> BM25Index | None:
+    """Return the shared BM25 index of the live RAG index (if it has one)."""
+    return _lexical.get()
+
+
+def get_dense_index() -> DenseIndex | None:
+    """Return the memory-mapped exact-search index to use, or None to use Chroma."""
+    backend = os.getenv("AGROSENSE_VECTOR_BACKEND", DEFAULT_VECTOR_BACKEND).lower()
+    if backend == "chroma":
+        return None
+    # "exact" and "auto" both fall back to Chroma for indexes without a matrix
+    return _dense.get()
+
+
+def get_topic_index() -> TopicIndex | None:
+    """Return the shared topic -> chunks table of the live RAG index (if it has one)."""
+    return _topics.get()
+
+
+def get_doc_store() -> DocStore | None:
+    """Return the shared chunk text store of the live RAG index (if it has one)."""
+    return _docs.get()
+
+
+def resolve_documents(results):
+    """
+    Retrieval results with their "content" filled in from the doc store.
+    Call this only where the text is needed (the answer prompt).
+    """
+    store = get_doc_store()
+    if store is None:
+        # Indexes without a doc store return their texts inline
+        return [dict(r) for r in results or [] if r.get("content")]
+    return store.resolve(results)
+
+
+_query_embeddings = None
+
+
+def get_query_embeddings():
+    """Cached query embedder used by the exact backend (Chroma has its own)."""
+    global _query_embeddings
+    if _query_embeddings is None:
+        from rag.embedding_cache import CachedEmbeddings
+
+        _query_embeddings = CachedEmbeddings(get_embeddings())
+    return _query_embeddings
+
+
+def retrieval_mode() -> str:
+    mode = os.getenv("AGROSENSE_RETRIEVAL_MODE", DEFAULT_RETRIEVAL_MODE).lower()
+    return mode if mode in RETRIEVAL_MODES else DEFAULT_RETRIEVAL_MODE
+
+
+def is_keyword_query(query: str, lexical: BM25Index | None) -> bool:
+    """Short queries made only of terms the corpus contains ("rice", "potassium deficiency")."""
+    if lexical is None:
+        return False
+    known, unknown = lexical.known_terms(query)
+    return 0 < len(known) <= KEYWORD_MAX_TERMS and not unknown
+
+
+def _resolve_mode(mode: str | None, query: str, lexical: BM25Index | None) -> str:
+    mode = mode or retrieval_mode()
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode!r} (expected one of {RETRIEVAL_MODES})")
+    if lexical is None:
+        return "dense"
+    if mode == "auto":
+        return "lexical" if is_keyword_query(query, lexical) else "hybrid"
+    return mode
+
+
+def _result_key(result: dict):
+    return result.get("chunk_id") or (result.get("source"), result.get("content"))
+
+
+def fuse_rrf(ranked_lists, k: int, rrf_k: int = RRF_K):
+    """
+    Reciprocal rank fusion: every list votes 1 / (rrf_k + rank) for its
+    results; results are returned best first, de-duplicated, with the
+    fused value as their "score".
+    """
+    scores = {}
+    first_seen = {}
+    for results in ranked_lists:
+        for rank, result in enumerate(results, start=1):
+            key = _result_key(result)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            first_seen.setdefault(key, result)
+    ordered = sorted(scores, key=lambda key: -scores[key])
+    return [{**first_seen[key], "score": scores[key]} for key in ordered[:k]]
+
+
+def _lexical_search(lexical: BM25Index, query: str, k: int, topic_filter: str | None):
+    with span("vectordb", "bm25", k=k) as s:
+        results = lexical.results(lexical.search(query, k=k, topic_filter=topic_filter))
+        s.set(results=len(results))
+        return results
+
+
+def _dense_search(query: str, k: int, topic_filter: str | None):
+    dense = get_dense_index()
+    if dense is not None:
+        embedding = get_query_embeddings().embed_query(query)
+        with span("vectordb", "exact", k=k, rows=len(dense), dtype=dense.dtype):
+            return dense.search_by_vector(embedding, k=k, topic_filter=topic_filter)
+
+    search_kwargs = {}
+    if topic_filter:
+        # Filter uses metadata keys; we stored "topic" in build_index.py
+        search_kwargs["filter"] = {"topic": topic_filter}
+
+    # The span includes the query embedding Chroma computes internally
+    with span("vectordb", "chroma", k=k):
+        try:
+            docs = get_vectordb().similarity_search(query, k=k, **search_kwargs)
+        except Exception:
+            # A stale handle (e.g. DB rebuilt underneath us) -> reopen once and retry.
+            # Other failures (e.g. the embedding call) are raised as-is.
+            if _handle.healthy():
+                raise
+            docs = _handle.reopen().similarity_search(query, k=k, **search_kwargs)
+    return _to_results(docs)
+
+
+def retrieve_agri_docs(query: str, k: int = 5, topic_filter: str | None = None, mode: str | None = None):
     """
     Main retrieval function for AgroSense.
 
@@ -38,27 +321,103 @@ def retrieve_agri_docs(query: str, k: int = 5, topic_filter: str | None = None):
         k: number of documents to return.
         topic_filter: optional crop/topic filter, e.g. "rice", "maize".
                      If provided, only docs with metadata["topic"] == topic_filter are considered.
+        mode: "dense" (vector search), "lexical" (BM25, no embedding call),
+              "hybrid" (both, fused with reciprocal rank fusion) or "auto"
+              (lexical for keyword queries, hybrid otherwise).
+              Defaults to AGROSENSE_RETRIEVAL_MODE or "auto".
 
     Returns:
-        List of dicts: [{ "content": ..., "source": ..., "topic": ... }, ...]
+        List of chunk references: [{ "chunk_id": ..., "source": ..., "topic": ..., "score": ... }, ...]
+        (pass them to resolve_documents() for the texts).
     """
-    vectordb = _load_vectordb()
+    lexical = get_lexical_index()
+    mode = _resolve_mode(mode, query, lexical)
+
+    if mode == "lexical":
+        return _lexical_search(lexical, query, k, topic_filter)
+    if mode == "dense":
+        return _dense_search(query, k, topic_filter)
+
+    pool = max(k, FUSION_CANDIDATES)
+    lexical_results = _lexical_search(lexical, query, pool, topic_filter)
+    dense_results = _dense_search(query, pool, topic_filter)
+    return fuse_rrf([dense_results, lexical_results], k=k)
 
-    search_kwargs = {}
-    if topic_filter:
-        # Filter uses metadata keys; we stored "topic" in build_index.py
-        search_kwargs["filter"] = {"topic": topic_filter}
 
-    docs = vectordb.similarity_search(query, k=k, **search_kwargs)
+def retrieve_topic_docs(topics, k: int = 5, per_topic: int | None = None):
+    """
+    Chunks of the given topics / crop names by direct lookup (no embedding,
+    no similarity search), topic by topic in the given order, at most k
+    (and at most per_topic from each topic, when given).
+    Returns [] if the live index has no topic table.
+    """
+    index = get_topic_index()
+    if index is None:
+        return []
 
+    with span("vectordb", "topic_lookup", k=k) as s:
+        results = []
+        for name in topics:
+            limit = k - len(results)
+            if per_topic is not None:
+                limit = min(limit, per_topic)
+            results.extend(index.lookup(name, limit=limit))
+            if len(results) >= k:
+                break
+        s.set(results=len(results))
+    return results
+
+
+def _to_results(docs):
+    """Chroma documents as chunk references; the text is kept only if the doc store lacks it."""
+    store = get_doc_store()
     results = []
     for d in docs:
-        results.append(
-            {
-                "content": d.page_content,
-                "source": d.metadata.get("source"),
-                "topic": d.metadata.get("topic"),
-            }
-        )
+        # chunk_id is None for indexes built before documents were chunked
+        result = chunk_ref(d.metadata)
+        if store is None or result["chunk_id"] not in store:
+            result["content"] = d.page_content
+        results.append(result)
 
     return results
+
+
+async def aretrieve_agri_docs(query: str, k: int = 5, topic_filter: str | None = None, mode: str | None = None):
+    """
+    Async version of retrieve_agri_docs.
+
+    The query is embedded with the async embeddings client; the local
+    vector lookup (exact matrix or Chroma) is run in a worker thread.
+    BM25 scoring is pure in-memory work and runs inline.
+    """
+    lexical = await asyncio.to_thread(get_lexical_index)
+    mode = _resolve_mode(mode, query, lexical)
+    if mode == "lexical":
+        return _lexical_search(lexical, query, k, topic_filter)
+
+    pool = k if mode == "dense" else max(k, FUSION_CANDIDATES)
+    dense = await asyncio.to_thread(get_dense_index)
+    if dense is not None:
+        embedding = await get_query_embeddings().aembed_query(query)
+        with span("vectordb", "exact", k=pool, rows=len(dense), dtype=dense.dtype):
+            dense_results = await asyncio.to_thread(
+                dense.search_by_vector, embedding, k=pool, topic_filter=topic_filter
+            )
+    else:
+        vectordb = await asyncio.to_thread(get_vectordb)
+
+        search_kwargs = {}
+        if topic_filter:
+            search_kwargs["filter"] = {"topic": topic_filter}
+
+        embedding = await vectordb.embeddings.aembed_query(query)
+        with span("vectordb", "chroma", k=pool):
+            docs = await asyncio.to_thread(
+                vectordb.similarity_search_by_vector, embedding, k=pool, **search_kwargs
+            )
+        dense_results = _to_results(docs)
+    if mode == "dense":
+        return dense_results
+
+    lexical_results = _lexical_search(lexical, query, pool, topic_filter)
+    return fuse_rrf([dense_results, lexical_results], k=k)
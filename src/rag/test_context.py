@@ -0,0 +1,50 @@
+# src/rag/test_context.py
+
+from rag.context import _format_chunk, assemble_context, count_tokens
+
+RICE = "Rice grows best in flooded fields with heavy rainfall and warm temperatures."
+JUTE = "Jute needs a hot, humid climate and well drained alluvial soil."
+MAIZE = "Maize prefers moderate rainfall, fertile loam and plenty of sunshine."
+
+
+def ref(chunk_id, content, score=None, topic=None):
+    result = {"chunk_id": chunk_id, "source": chunk_id, "topic": topic or chunk_id, "content": content}
+    if score is not None:
+        result["score"] = score
+    return result
+
+
+def main():
+    print("Testing context assembly (offline)...")
+
+    # Retrieval order is kept, whatever the scores say (RRF: higher is better)
+    ctx = assemble_context([ref("a", RICE, 0.033), ref("b", JUTE, 0.016)], budget=1000)
+    print("order:", ctx["used"])
+    assert ctx["used"] == ["a", "b"], ctx["used"]
+
+    # Topic lookups (no score) placed first stay ahead of scored search hits
+    ctx = assemble_context([ref("rice::0", RICE), ref("maize::0", MAIZE, 0.05), ref("jute::0", JUTE, 0.04)], budget=1000)
+    print("direct first:", ctx["used"])
+    assert ctx["used"] == ["rice::0", "maize::0", "jute::0"], ctx["used"]
+
+    # Same chunk twice, and a chunk whose text is already covered, are dropped
+    ctx = assemble_context([ref("a", RICE), ref("a", RICE), ref("c", RICE + " ")], budget=1000)
+    print("dedup:", ctx["used"], ctx["dropped_duplicates"])
+    assert ctx["used"] == ["a"] and ctx["dropped_duplicates"] == 2, ctx
+
+    # Budget for exactly the first two chunks: the last one is dropped, not the first
+    first_two = count_tokens(_format_chunk(ref("a", RICE), RICE)) + 1 + count_tokens(_format_chunk(ref("b", JUTE), JUTE))
+    ctx = assemble_context([ref("a", RICE), ref("b", JUTE), ref("c", MAIZE)], budget=first_two)
+    print("budget:", ctx["used"], ctx["tokens"], "/", ctx["budget"], "dropped", ctx["dropped_budget"])
+    assert ctx["used"] == ["a", "b"] and ctx["dropped_budget"] == 1, ctx
+    assert ctx["tokens"] <= ctx["budget"], ctx
+
+    # Nothing fits
+    ctx = assemble_context([ref("a", RICE)], budget=2)
+    assert ctx["used"] == [] and ctx["text"] == "" and ctx["dropped_budget"] == 1, ctx
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
 # src/rag/test_retriever.py
 
-from rag.retriever import retrieve_agri_docs
+from rag.retriever import resolve_documents, retrieve_agri_docs
 
 
 def main():
     query = "Which crop prefers flooded fields and high water availability?"
     print("Query:", query)
 
-    results = retrieve_agri_docs(query, k=3)
+    results = resolve_documents(retrieve_agri_docs(query, k=3))
     print("\nTop 3 results (no filter):")
     for i, r in enumerate(results, start=1):
         print(f"\n--- Result {i} ---")
@@ -17,7 +17,7 @@ def main():
     
     # Example with topic filter for rice
     print("\n\nNow with topic_filter='rice':")
-    results_rice = retrieve_agri_docs(query, k=3, topic_filter="rice")
+    results_rice = resolve_documents(retrieve_agri_docs(query, k=3, topic_filter="rice"))
     for i, r in enumerate(results_rice, start=1):
         print(f"\n--- Rice Result {i} ---")
         print("Source:", r["source"])
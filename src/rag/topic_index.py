@@ -0,0 +1,77 @@
+# src/rag/topic_index.py
+
+"""
+Topic -> chunks lookup table for the RAG index.
+
+Every document has a `topic` (its file name: "rice", "maize",
+"npk_deficiency", ...). build_index.py writes topics.json with references
+to the chunks of each topic in document order (texts are in rag.doc_store),
+so notes for a known crop are fetched by key instead of by semantic search
+(no embedding call, same result every time).
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from rag.doc_store import chunk_ref
+
+TOPIC_INDEX_FILE = "topics.json"
+FORMAT_VERSION = 1
+
+
+def topic_key(name: str) -> str:
+    """Normalize a crop / topic name: "Kidney Beans" -> "kidneybeans"."""
+    return re.sub(r"[^a-z0-9]+", "", (name or "").casefold())
+
+
+class TopicIndex:
+    def __init__(self, topics: Dict[str, List[Dict]]):
+        self.topics = topics
+        self._keys = {topic_key(t): t for t in topics}
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> "TopicIndex":
+        """Group chunks (dicts with source, topic, chunk_id) by topic, keeping their order."""
+        topics: Dict[str, List[Dict]] = {}
+        for chunk in chunks:
+            topics.setdefault(chunk["topic"], []).append(chunk_ref(chunk))
+        return cls(topics)
+
+    def __len__(self):
+        return len(self.topics)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Topic for a crop name, tolerating case, spacing and singular/plural
+        differences ("mothbeans" -> "mothbean").
+        """
+        key = topic_key(name)
+        if not key:
+            return None
+        for candidate in (key, key[:-1] if key.endswith("s") else key + "s"):
+            if candidate in self._keys:
+                return self._keys[candidate]
+        return None
+
+    def lookup(self, name: str, limit: Optional[int] = None) -> List[Dict]:
+        topic = self.resolve(name)
+        if topic is None:
+            return []
+        chunks = self.topics[topic]
+        return [dict(c) for c in (chunks if limit is None else chunks[:limit])]
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT_VERSION, "topics": self.topics}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TopicIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported topic index format: {data.get('format')}")
+        return cls(data["topics"])
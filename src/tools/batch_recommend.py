@@ -0,0 +1,195 @@
+# src/tools/batch_recommend.py
+
+"""
+Batch crop recommendation over a CSV of field readings.
+
+The input has the columns of crop_recommendation_raw.csv (N, P, K,
+temperature, humidity, ph, rainfall; names are matched case-insensitively,
+missing columns / empty cells are ignored when scoring). It is read in
+chunks of lines; a process pool parses each chunk, scores it in one
+vectorized pass (rank_crops) and formats the output, and the parent
+appends the results as soon as the chunk and all earlier ones are done,
+in input order. Only a few chunks are in memory at any time, so the file
+size does not matter. Rows must be one line each (no quoted newlines).
+
+Every output row is the input line unchanged followed by crop_1,
+score_1, ..., crop_k, score_k (lower score = better match). When the input has a
+`label` column, top-1 / top-k accuracy against it is reported as well.
+
+Run from src/:
+    python -m tools.batch_recommend ../data/crop_recommendation_raw.csv -o scored.csv
+    python -m tools.batch_recommend lab_export.csv --top-k 3 --workers 4 > scored.csv
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tools.crop_recommender import PARAM_KEYS, rank_crops
+from tools.profile_store import get_crop_profiles
+
+DEFAULT_CHUNK_SIZE = 50_000
+LABEL_COLUMN = "label"
+
+
+def _feature_matrix(frame) -> np.ndarray:
+    """(rows, features) float array in PARAM_KEYS order; NaN where a value is missing."""
+    columns = {str(c).strip().lower(): c for c in frame.columns}
+    q = np.full((len(frame), len(PARAM_KEYS)), np.nan, dtype=np.float64)
+    for j, key in enumerate(PARAM_KEYS):
+        if key in columns:
+            q[:, j] = pd.to_numeric(frame[columns[key]], errors="coerce").to_numpy(dtype=np.float64)
+    return q
+
+
+def _score_chunk(header: str, lines: list, top_k: int) -> dict:
+    """
+    Runs in a worker process: parse, score and format one chunk of input
+    lines. Returns the output CSV text plus the counts for the summary.
+    Parsing and formatting happen here as well, so the parent only moves
+    text between the files and the pool.
+    """
+    frame = pd.read_csv(io.StringIO(header + "\n" + "\n".join(lines)), skipinitialspace=True)
+    if len(frame) != len(lines):
+        raise ValueError(f"parsed {len(frame)} rows from {len(lines)} lines (quoted newlines?)")
+    idx, scores = rank_crops(_feature_matrix(frame), top_k)
+    names = np.array(get_crop_profiles().names, dtype=object)
+
+    # crop, score, crop, score, ... per row, formatted with one % per line
+    results = np.empty((len(lines), 2 * idx.shape[1]), dtype=object)
+    results[:, 0::2] = names[idx]
+    results[:, 1::2] = scores
+    row_format = "%s," + ",".join(["%s,%.4f"] * idx.shape[1]) + "\n"
+    out = [row_format % (line, *row) for line, row in zip(lines, results.tolist())]
+
+    counts = {"rows": len(lines), "labeled": 0, "top1_hits": 0, "topk_hits": 0}
+    label = {str(c).strip().lower(): c for c in frame.columns}.get(LABEL_COLUMN)
+    if label is not None and idx.shape[1]:
+        labels = frame[label]
+        known = labels.notna().to_numpy()
+        labels = np.asarray(labels.astype(str).str.strip().str.lower(), dtype=object)
+        crops = np.array([name.lower() for name in names], dtype=object)[idx]
+        hits = crops[known] == labels[known, None]
+        counts.update(
+            labeled=int(known.sum()),
+            top1_hits=int(hits[:, 0].sum()),
+            topk_hits=int(hits.any(axis=1).sum()),
+        )
+    return {"text": "".join(out), **counts}
+
+
+def _read_chunks(f, chunk_size: int):
+    """Non-empty lines of `f` (without line endings), chunk_size at a time."""
+    chunk = []
+    for line in f:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def batch_recommend(
+    input_path: str,
+    output,
+    top_k: int = 5,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = None,
+) -> dict:
+    """
+    Score every row of `input_path` and write the results as CSV to
+    `output` (a text file object). workers=1 scores in this process.
+    Returns the summary: rows, seconds, rows_per_s and, with a label
+    column, labeled_rows, top1_accuracy and top{k}_accuracy.
+    """
+    workers = workers or os.cpu_count() or 1
+    totals = {"rows": 0, "labeled": 0, "top1_hits": 0, "topk_hits": 0}
+    started = time.perf_counter()
+
+    def write(result):
+        output.write(result.pop("text"))
+        for key, value in result.items():
+            totals[key] += value
+
+    with open(input_path, "r", encoding="utf-8", newline="") as f:
+        header = f.readline().rstrip("\r\n")
+        if not header:
+            raise ValueError(f"{input_path} is empty")
+        k = min(top_k, len(get_crop_profiles()))
+        result_columns = ",".join(f"crop_{i},score_{i}" for i in range(1, k + 1))
+        output.write(f"{header},{result_columns}\n")
+
+        if workers == 1:
+            for lines in _read_chunks(f, chunk_size):
+                write(_score_chunk(header, lines, top_k))
+        else:
+            # Results are written in input order; a bounded number of
+            # chunks is in flight so memory stays flat
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for lines in _read_chunks(f, chunk_size):
+                    pending.append(pool.submit(_score_chunk, header, lines, top_k))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    seconds = time.perf_counter() - started
+    summary = {
+        "rows": totals["rows"],
+        "seconds": seconds,
+        "rows_per_s": totals["rows"] / seconds if seconds > 0 else 0.0,
+    }
+    if totals["labeled"]:
+        summary["labeled_rows"] = totals["labeled"]
+        summary["top1_accuracy"] = totals["top1_hits"] / totals["labeled"]
+        summary[f"top{top_k}_accuracy"] = totals["topk_hits"] / totals["labeled"]
+    return summary
+
+
+def _print_summary(summary: dict, top_k: int, file):
+    print(f"Scored {summary['rows']:,} rows in {summary['seconds']:.2f} s ({summary['rows_per_s']:,.0f} rows/s)", file=file)
+    if "labeled_rows" in summary:
+        print(f"  labeled rows:    {summary['labeled_rows']:,}", file=file)
+        print(f"  top-1 accuracy:  {summary['top1_accuracy']:.2%}", file=file)
+        print(f"  top-{top_k} accuracy:  {summary[f'top{top_k}_accuracy']:.2%}", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV of field readings with the crop recommender.")
+    parser.add_argument("input", help="CSV with N, P, K, temperature, humidity, ph, rainfall [, label]")
+    parser.add_argument("-o", "--output", default="-", help="output CSV (default: stdout)")
+    parser.add_argument("--top-k", type=int, default=5, help="crops per row")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows scored per task")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 1 = no pool)")
+    args = parser.parse_args()
+
+    if args.top_k < 1 or args.chunk_size < 1:
+        parser.error("--top-k and --chunk-size must be positive")
+
+    if args.output == "-":
+        summary = batch_recommend(args.input, sys.stdout, args.top_k, args.chunk_size, args.workers)
+        # Keep stdout clean, it carries the CSV
+        _print_summary(summary, args.top_k, sys.stderr)
+        return
+
+    tmp = f"{args.output}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as output:
+        summary = batch_recommend(args.input, output, args.top_k, args.chunk_size, args.workers)
+    os.replace(tmp, args.output)
+    _print_summary(summary, args.top_k, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
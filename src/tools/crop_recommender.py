@@ -1,16 +1,34 @@
 # src/tools/crop_recommender.py
 
 import os
-import pandas as pd
+import numpy as np
 
-ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-CROP_PROFILES_PATH = os.path.join(ROOT, "data", "crop_profiles.csv")
+from tools.profile_store import CROP_PROFILES_PATH, FEATURE_COLUMNS, get_crop_profiles
+
+# Agent / user parameter names -> profile column (same order as FEATURE_COLUMNS)
+PARAM_TO_COLUMN = {
+    "n": "ideal_n",
+    "p": "ideal_p",
+    "k": "ideal_k",
+    "temperature": "ideal_temp",
+    "humidity": "ideal_humidity",
+    "ph": "ideal_ph",
+    "rainfall": "ideal_rainfall",
+}
+PARAM_KEYS = list(PARAM_TO_COLUMN.keys())
 
 
 def load_crop_profiles():
+    """
+    Load crop_profiles.csv as a DataFrame (for analysis / data prep).
+    The recommendation path uses the cached get_crop_profiles() table instead.
+    """
     if not os.path.exists(CROP_PROFILES_PATH):
         raise FileNotFoundError(f"crop_profiles.csv not found at {CROP_PROFILES_PATH}")
 
+    # pandas is only needed here (analysis / data prep), not on the chat path
+    import pandas as pd
+
     df = pd.read_csv(CROP_PROFILES_PATH)
     return df
 
@@ -28,36 +46,131 @@ def score_crop(user_values, ideal_values):
     return score
 
 
-def recommend_crops(n, p, k, temperature, humidity, ph, rainfall, top_k=5):
-    df = load_crop_profiles()
+def queries_to_matrix(queries):
+    """
+    Convert field readings into a (num_queries, num_features) float array.
 
-    user = {
-        "ideal_n": n,
-        "ideal_p": p,
-        "ideal_k": k,
-        "ideal_temp": temperature,
-        "ideal_humidity": humidity,
-        "ideal_ph": ph,
-        "ideal_rainfall": rainfall,
-    }
+    Each query can be a dict keyed by parameter name ("n", "p", "k",
+    "temperature", "humidity", "ph", "rainfall") or by profile column name
+    ("ideal_n", ...). A 2-D array-like in PARAM_KEYS order is also accepted.
+    Missing values (absent keys, None, NaN) become NaN and are ignored when scoring.
+    """
+    if isinstance(queries, np.ndarray):
+        q = np.asarray(queries, dtype=np.float64)
+        if q.ndim == 1:
+            q = q[None, :]
+        if q.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(
+                f"Expected {len(FEATURE_COLUMNS)} columns in query array, got {q.shape[1]}"
+            )
+        return q
 
-    scores = []
+    queries = list(queries)
+    q = np.full((len(queries), len(FEATURE_COLUMNS)), np.nan, dtype=np.float64)
+    for i, query in enumerate(queries):
+        if isinstance(query, dict):
+            for j, (param, column) in enumerate(PARAM_TO_COLUMN.items()):
+                val = query.get(param, query.get(column))
+                if val is not None:
+                    q[i, j] = float(val)
+        else:
+            for j, val in enumerate(query):
+                if val is not None:
+                    q[i, j] = float(val)
+    return q
 
-    for _, row in df.iterrows():
-        ideal = {
-            "ideal_n": row["ideal_n"],
-            "ideal_p": row["ideal_p"],
-            "ideal_k": row["ideal_k"],
-            "ideal_temp": row["ideal_temp"],
-            "ideal_humidity": row["ideal_humidity"],
-            "ideal_ph": row["ideal_ph"],
-            "ideal_rainfall": row["ideal_rainfall"],
-        }
 
-        s = score_crop(user, ideal)
-        scores.append((row["crop"], s))
+def score_matrix(profiles, queries):
+    """
+    Masked L1 distance between every query and every crop profile.
 
-    # Sort: lowest difference is best match
-    scores_sorted = sorted(scores, key=lambda x: x[1])
+    Args:
+        profiles: (num_crops, num_features) array of ideal values.
+        queries: (num_queries, num_features) array, NaN = parameter not given.
+
+    Returns:
+        (num_queries, num_crops) array of scores (lower = better).
+    """
+    scores = np.zeros((queries.shape[0], profiles.shape[0]), dtype=np.float64)
+    for j in range(profiles.shape[1]):
+        q = queries[:, j]
+        given = ~np.isnan(q)
+        if not given.any():
+            continue
+        # Only rows that actually provided this parameter contribute
+        diff = np.abs(q[given, None] - profiles[None, :, j])
+        scores[given] += diff
+    return scores
+
+
+def top_k_indices(scores, top_k):
+    """
+    Indices of the top_k lowest scores per row, best first.
+    Uses a partial sort so only the selected entries get fully ordered.
+    """
+    num_crops = scores.shape[1]
+    top_k = max(0, min(top_k, num_crops))
+    if top_k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+
+    if top_k < num_crops:
+        part = np.argpartition(scores, top_k - 1, axis=1)[:, :top_k]
+    else:
+        part = np.broadcast_to(np.arange(num_crops), scores.shape).copy()
+
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
 
-    return scores_sorted[:top_k]
+
+def rank_crops(queries, top_k=5):
+    """
+    Array form of recommend_crops_batch, for callers that handle many rows.
+
+    Args:
+        queries: (num_queries, num_features) array, NaN = parameter not given.
+        top_k: number of crops to return per query.
+
+    Returns:
+        (indices, scores): two (num_queries, top_k) arrays, best first.
+        Indices are rows of get_crop_profiles().names.
+    """
+    table = get_crop_profiles()
+    scores = score_matrix(table.matrix, queries)
+    idx = top_k_indices(scores, top_k)
+    return idx, np.take_along_axis(scores, idx, axis=1)
+
+
+def recommend_crops_batch(queries, top_k=5):
+    """
+    Score many field readings in one vectorized pass.
+
+    Args:
+        queries: iterable of dicts (see queries_to_matrix) or a 2-D array.
+        top_k: number of crops to return per query.
+
+    Returns:
+        One list per query: [(crop, score), ...] sorted best first.
+    """
+    names = get_crop_profiles().names
+    idx, best = rank_crops(queries_to_matrix(queries), top_k)
+
+    return [
+        [(names[c], float(s)) for c, s in zip(row_idx, row_scores)]
+        for row_idx, row_scores in zip(idx.tolist(), best.tolist())
+    ]
+
+
+def recommend_crops(n, p, k, temperature, humidity, ph, rainfall, top_k=5):
+    user = {
+        "n": n,
+        "p": p,
+        "k": k,
+        "temperature": temperature,
+        "humidity": humidity,
+        "ph": ph,
+        "rainfall": rainfall,
+    }
+
+    # Sort: lowest difference is best match
+    return recommend_crops_batch([user], top_k=top_k)[0]
@@ -0,0 +1,158 @@
+# src/tools/profile_store.py
+
+import csv
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CROP_PROFILES_PATH = os.path.join(ROOT, "data", "crop_profiles.csv")
+
+# Order of the feature columns in the profile matrix
+FEATURE_COLUMNS = [
+    "ideal_n",
+    "ideal_p",
+    "ideal_k",
+    "ideal_temp",
+    "ideal_humidity",
+    "ideal_ph",
+    "ideal_rainfall",
+]
+
+# Non-numeric columns kept alongside the feature matrix
+TEXT_COLUMNS = ["soil_types", "season", "description"]
+
+
+class CropProfile:
+    """One row of crop_profiles.csv as a light record."""
+
+    __slots__ = ("crop", *FEATURE_COLUMNS, *TEXT_COLUMNS)
+
+    def __init__(self, crop, values, texts):
+        self.crop = crop
+        for name, val in zip(FEATURE_COLUMNS, values):
+            setattr(self, name, float(val))
+        for name, val in zip(TEXT_COLUMNS, texts):
+            setattr(self, name, val)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"CropProfile({self.crop!r})"
+
+
+class CropProfileTable:
+    """
+    Compact in-memory crop profile table.
+
+    - names: tuple of crop names (row order)
+    - index: crop name -> row number
+    - matrix: (num_crops, num_features) float32, column-major, so every
+      entry of `columns` is a contiguous view into it
+    - version: sha256 of the CSV bytes the table was built from
+    """
+
+    __slots__ = ("names", "index", "matrix", "columns", "texts", "version")
+
+    def __init__(self, names, matrix, texts, version):
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.matrix = np.asfortranarray(matrix, dtype=np.float32)
+        self.matrix.setflags(write=False)
+        self.columns = {name: self.matrix[:, j] for j, name in enumerate(FEATURE_COLUMNS)}
+        self.texts = texts
+        self.version = version
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, crop):
+        return crop in self.index
+
+    def __iter__(self):
+        for i in range(len(self.names)):
+            yield self._row(i)
+
+    def get(self, crop):
+        i = self.index.get(crop)
+        return None if i is None else self._row(i)
+
+    def _row(self, i):
+        return CropProfile(
+            self.names[i],
+            self.matrix[i].tolist(),
+            [self.texts[name][i] for name in TEXT_COLUMNS],
+        )
+
+
+def parse_crop_profiles(raw: bytes, version: str) -> CropProfileTable:
+    """Build a CropProfileTable from the raw bytes of crop_profiles.csv."""
+    reader = csv.DictReader(io.StringIO(raw.decode("utf-8")))
+
+    names = []
+    rows = []
+    texts = {name: [] for name in TEXT_COLUMNS}
+    for rec in reader:
+        names.append(rec["crop"])
+        rows.append([float(rec[col]) for col in FEATURE_COLUMNS])
+        for name in TEXT_COLUMNS:
+            texts[name].append(rec.get(name) or "")
+
+    matrix = np.array(rows, dtype=np.float32).reshape(len(rows), len(FEATURE_COLUMNS))
+    return CropProfileTable(names, matrix, {k: tuple(v) for k, v in texts.items()}, version)
+
+
+# ---------- Process-wide cache ----------
+
+_lock = threading.Lock()
+_cache = {}  # path -> (stat signature, CropProfileTable)
+
+
+def _stat_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_crop_profiles(path: str = CROP_PROFILES_PATH) -> CropProfileTable:
+    """
+    Return the crop profile table, loading the CSV at most once per change.
+
+    A cheap os.stat() check runs on every call. Only when mtime/size differ
+    is the file re-read; if its content hash is unchanged the cached table
+    is kept, otherwise it is re-parsed.
+    """
+    try:
+        sig = _stat_signature(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"crop_profiles.csv not found at {path}")
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        version = hashlib.sha256(raw).hexdigest()
+
+        if cached is not None and cached[1].version == version:
+            table = cached[1]
+        else:
+            table = parse_crop_profiles(raw, version)
+
+        _cache[path] = (sig, table)
+        return table
+
+
+def clear_profile_cache():
+    """Drop all cached tables (mainly for tests / tooling)."""
+    with _lock:
+        _cache.clear()
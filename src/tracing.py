@@ -0,0 +1,421 @@
+# src/tracing.py
+
+"""
+Lightweight tracing and metrics for AgroSense.
+
+Every graph node and every external call (LLM, embeddings, vector search,
+STT, TTS) is wrapped in a span that records wall time plus optional
+attributes: tokens_in / tokens_out, bytes_in / bytes_out, cache_hit
+(or cache_hits / cache_misses for batches).
+
+Spans end up in three places:
+  - the current trace (one per chat turn, see AnswerStream.trace) so the UI
+    can show a timing table,
+  - process-wide metrics, rendered in Prometheus text format by
+    prometheus_text() / served on /metrics by start_metrics_server(),
+  - a JSON-lines file if AGROSENSE_TRACE_FILE is set.
+
+Usage:
+    with span("vectordb", "chroma_search", k=5) as s:
+        ...
+        s.set(results=len(docs))
+
+    @traced("tts", "synthesize")
+    def _synthesize(...): ...
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Span attributes that are summed into counters
+COUNTER_ATTRS = ("tokens_in", "tokens_out", "bytes_in", "bytes_out", "cache_hits", "cache_misses")
+
+_current_trace = contextvars.ContextVar("agrosense_trace", default=None)
+_current_span = contextvars.ContextVar("agrosense_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "depth", "start", "duration_s", "attrs", "error")
+
+    def __init__(self, kind: str, name: str, attrs: Optional[dict] = None, parent: "Span" = None, trace_id=None):
+        self.kind = kind
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        self.start = time.time()
+        self.duration_s = None
+        self.attrs = dict(attrs or {})
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start": self.start,
+            "duration_s": self.duration_s,
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+class Trace:
+    """All spans recorded while one chat turn ran."""
+
+    def __init__(self, name: str = "turn"):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def rows(self) -> List[dict]:
+        """Spans in start order, for a timing table."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        rows = []
+        for s in spans:
+            row = {"step": "  " * s.depth + s.name, "kind": s.kind, "ms": round((s.duration_s or 0.0) * 1000, 1)}
+            for key in ("tokens_in", "tokens_out", "bytes_in", "bytes_out", "cache_hit"):
+                if key in s.attrs:
+                    row[key] = s.attrs[key]
+            if s.error:
+                row["error"] = s.error
+            rows.append(row)
+        return rows
+
+
+class Tracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[tuple, dict] = {}   # (kind, name) -> {count, errors, sum, buckets}
+        self._counters: Dict[tuple, float] = {}  # (kind, name, attr) -> total
+        self._jsonl_lock = threading.Lock()
+
+    # ---------- recording ----------
+
+    def record(self, span: Span):
+        trace = _current_trace.get()
+        if trace is not None:
+            span.trace_id = span.trace_id or trace.trace_id
+            trace.add(span)
+
+        key = (span.kind, span.name)
+        with self._lock:
+            entry = self._latency.setdefault(
+                key, {"count": 0, "errors": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+            )
+            entry["count"] += 1
+            entry["sum"] += span.duration_s or 0.0
+            if span.error:
+                entry["errors"] += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if (span.duration_s or 0.0) <= bound:
+                    entry["buckets"][i] += 1
+
+            attrs = dict(span.attrs)
+            if "cache_hit" in attrs:
+                attrs["cache_hits" if attrs["cache_hit"] else "cache_misses"] = 1
+            for attr in COUNTER_ATTRS:
+                value = attrs.get(attr)
+                if isinstance(value, (int, float)) and value:
+                    counter = (span.kind, span.name, attr)
+                    self._counters[counter] = self._counters.get(counter, 0) + value
+
+        path = os.getenv("AGROSENSE_TRACE_FILE")
+        if path:
+            line = json.dumps(span.as_dict(), ensure_ascii=False, default=str)
+            with self._jsonl_lock:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attrs):
+        parent = _current_span.get()
+        trace = _current_trace.get()
+        s = Span(kind, name, attrs, parent=parent, trace_id=trace.trace_id if trace else None)
+        token = _current_span.set(s)
+        start = time.perf_counter()
+        try:
+            yield s
+        except BaseException as e:
+            s.error = type(e).__name__
+            raise
+        finally:
+            s.duration_s = time.perf_counter() - start
+            _reset(_current_span, token)
+            self.record(s)
+
+    def traced(self, kind: str, name: Optional[str] = None):
+        """Decorator: run the (sync or async) function inside a span."""
+
+        def decorator(func):
+            span_name = name or func.__name__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(kind, span_name):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(kind, span_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def trace(self, name: str = "turn"):
+        """
+        Collect every span recorded inside this block, including asyncio tasks
+        started from it. Plain thread pool workers do not inherit the context;
+        submit their work through in_context() to keep their spans.
+        """
+        trace = Trace(name)
+        token = _current_trace.set(trace)
+        try:
+            with self.span("turn", name):
+                yield trace
+        finally:
+            _reset(_current_trace, token)
+
+    # ---------- export ----------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "latency": {f"{k}/{n}": dict(v, buckets=list(v["buckets"])) for (k, n), v in self._latency.items()},
+                "counters": {f"{k}/{n}/{a}": v for (k, n, a), v in self._counters.items()},
+            }
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP agrosense_span_seconds Wall time of graph nodes and external calls.",
+            "# TYPE agrosense_span_seconds histogram",
+        ]
+        with self._lock:
+            latency = sorted(self._latency.items())
+            counters = sorted(self._counters.items())
+
+        for (kind, name), entry in latency:
+            labels = f'kind="{_escape(kind)}",name="{_escape(name)}"'
+            for bound, count in zip(LATENCY_BUCKETS, entry["buckets"]):
+                lines.append(f'agrosense_span_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'agrosense_span_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+            lines.append(f"agrosense_span_seconds_sum{{{labels}}} {entry['sum']:.6f}")
+            lines.append(f"agrosense_span_seconds_count{{{labels}}} {entry['count']}")
+
+        lines.append("# HELP agrosense_span_errors_total Spans that ended with an exception.")
+        lines.append("# TYPE agrosense_span_errors_total counter")
+        for (kind, name), entry in latency:
+            lines.append(f'agrosense_span_errors_total{{kind="{_escape(kind)}",name="{_escape(name)}"}} {entry["errors"]}')
+
+        by_attr: Dict[str, list] = {}
+        for (kind, name, attr), value in counters:
+            by_attr.setdefault(attr, []).append((kind, name, value))
+        for attr in COUNTER_ATTRS:
+            if attr not in by_attr:
+                continue
+            metric = f"agrosense_{attr}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for kind, name, value in by_attr[attr]:
+                lines.append(f'{metric}{{kind="{_escape(kind)}",name="{_escape(name)}"}} {value:g}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._counters.clear()
+
+
+def _reset(var, token):
+    try:
+        var.reset(token)
+    except ValueError:
+        # Token from another context (e.g. a generator closed elsewhere)
+        var.set(None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def annotate(**attrs):
+    """Add attributes to the innermost active span (no-op outside a span)."""
+    s = _current_span.get()
+    if s is not None:
+        s.set(**attrs)
+
+
+def in_context(func):
+    """
+    `func` bound to a copy of the caller's context (current trace and
+    parent span), for ThreadPoolExecutor.submit. Bind once per task: one
+    context cannot be entered by two threads at the same time.
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+# ---------- LangChain integration ----------
+
+class _LLMSpanRecorder:
+    """Records one "llm" span per chat model call, with token usage when reported."""
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        name = params.get("model") or params.get("model_name") or (serialized or {}).get("name") or "chat"
+        prompt_bytes = sum(len(str(m.content).encode("utf-8")) for batch in messages for m in batch)
+        with self._lock:
+            self._runs[run_id] = (name, time.perf_counter(), _current_span.get(), _current_trace.get(), prompt_bytes)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, response=response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=type(error).__name__)
+
+    def _finish(self, run_id, response=None, error=None):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        name, start, parent, trace, prompt_bytes = run
+
+        s = Span("llm", name, {"bytes_in": prompt_bytes}, parent=parent, trace_id=trace.trace_id if trace else None)
+        s.start = time.time() - (time.perf_counter() - start)
+        s.duration_s = time.perf_counter() - start
+        s.error = error
+
+        if response is not None:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            tokens_in = usage.get("prompt_tokens")
+            tokens_out = usage.get("completion_tokens")
+            text = ""
+            for generations in response.generations:
+                for gen in generations:
+                    text += gen.text or ""
+                    meta = getattr(getattr(gen, "message", None), "usage_metadata", None)
+                    if meta and tokens_in is None:
+                        tokens_in, tokens_out = meta.get("input_tokens"), meta.get("output_tokens")
+            s.set(bytes_out=len(text.encode("utf-8")))
+            if tokens_in is not None:
+                s.set(tokens_in=tokens_in, tokens_out=tokens_out)
+
+        # Callbacks may run in another thread: record into the trace of the call
+        token = _current_trace.set(trace)
+        try:
+            tracer.record(s)
+        finally:
+            _reset(_current_trace, token)
+
+
+_callback_handler = None
+_callback_lock = threading.Lock()
+
+
+def callback_handler():
+    """
+    Process-wide LangChain callback handler for chat models (see _LLMSpanRecorder).
+    langchain_core is imported on first call, not with this module.
+    """
+    global _callback_handler
+    if _callback_handler is None:
+        with _callback_lock:
+            if _callback_handler is None:
+                from langchain_core.callbacks import BaseCallbackHandler
+
+                class TracingCallbackHandler(_LLMSpanRecorder, BaseCallbackHandler):
+                    pass
+
+                _callback_handler = TracingCallbackHandler()
+    return _callback_handler
+
+
+# ---------- /metrics endpoint ----------
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1"):
+    """
+    Serve prometheus_text() on http://host:port/metrics from a daemon thread.
+    Port defaults to AGROSENSE_METRICS_PORT; nothing is started without one.
+    Safe to call repeatedly (e.g. on every Streamlit rerun).
+    """
+    global _server
+    port = port or int(os.getenv("AGROSENSE_METRICS_PORT", "0") or 0)
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            print("Could not start metrics server:", repr(e))
+            return None
+        threading.Thread(target=server.serve_forever, daemon=True, name="agrosense-metrics").start()
+        _server = server
+        return server